@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""
+compare two benchmark JSON outputs (suite.py, page_build.py, ...)
+
+Prints every timing of both files and their ratio (new / old), exits with 1
+if any timing got slower than the threshold.
+
+  python benchmarks/compare.py before.json after.json --threshold 1.2
+"""
+import sys
+import argparse
+import json
+
+def timings(data, path='') -> dict:
+  "flat {path: seconds} of all *_s values, list items are named by their first value"
+  res = {}
+  if isinstance(data, dict):
+    for key, value in data.items():
+      if key.endswith('_s') and isinstance(value, (int, float)):
+        res[f"{path}.{key}".lstrip('.')] = value
+      else:
+        res.update(timings(value, f"{path}.{key}"))
+  elif isinstance(data, list):
+    for i, value in enumerate(data):
+      name = next(iter(value.items())) if isinstance(value, dict) and value else ('', i)
+      res.update(timings(value, f"{path}[{name[0]}={name[1]}]"))
+  return res
+
+def main(args):
+  with open(args.old) as file:
+    old = timings(json.load(file))
+  with open(args.new) as file:
+    new = timings(json.load(file))
+  slower = 0
+  for key in [i for i in new if i in old]:
+    ratio = new[key] / old[key] if old[key] else float('inf')
+    mark = ''
+    if ratio > args.threshold:
+      mark = ' SLOWER'
+      slower += 1
+    print(f"{key:60} {old[key]:12.6f} {new[key]:12.6f} {ratio:7.2f}{mark}")
+  return 1 if slower else 0
+
+def cli():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,
+  )
+  parser.add_argument('old', help="JSON output of the reference version")
+  parser.add_argument('new', help="JSON output to compare")
+  parser.add_argument('--threshold', type=float, default=1.2,
+                      help="Ratio new / old above which a timing counts as slower")
+  args = parser.parse_args()
+  return main(args)
+
+if __name__ == '__main__':
+  sys.exit(cli())
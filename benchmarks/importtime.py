@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+import and startup time of the command line entry points
+
+Runs every case in a fresh interpreter with `-X importtime` and reports
+the cumulative import time of the top level modules and the wall clock
+time of the whole run, best of N.
+
+  controldeck_core   import of the lightweight core (controldeck-gui, --help)
+  controldeck        import of the server module (justpy, addict, ...)
+  help               `controldeck --help`
+  gui_import         import of controldeck_gui (needs pywebview)
+
+  python benchmarks/importtime.py
+  python benchmarks/importtime.py --repeat 10
+"""
+import sys
+import os
+import argparse
+import json
+import subprocess
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+CASES = {
+  'controldeck_core': "import controldeck_core",
+  'controldeck': "import controldeck",
+  'help': "import sys, controldeck_core; sys.argv = ['controldeck', '--help']; controldeck_core.cli()",
+  'gui_import': "import controldeck_gui",
+}
+
+def importtime(stderr) -> dict:
+  "cumulative microseconds of the top level imports in -X importtime output"
+  res = {}
+  for line in stderr.splitlines():
+    if not line.startswith('import time:') or '|' not in line:
+      continue
+    _, cumulative, name = line[len('import time:'):].split('|')
+    if not name.startswith('  ') and cumulative.strip().isdigit():  # top level: no extra indentation
+      res[name.strip()] = int(cumulative)
+  return res
+
+def measure(code, repeat) -> dict:
+  best = None
+  for _ in range(repeat):
+    t = time.perf_counter()
+    proc = subprocess.run(
+      [sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+      stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - t
+    if proc.returncode != 0:
+      return {'error': proc.stderr.strip().splitlines()[-1]}
+    imports = importtime(proc.stderr)
+    if best is None or wall < best['wall_s']:
+      best = {
+        'wall_s': round(wall, 4),
+        'import_s': round(sum(imports.values()) / 1e6, 4),
+        'slowest': dict(sorted(imports.items(), key=lambda i: -i[1])[:5]),
+      }
+  return best
+
+def main(args):
+  results = {}
+  for name, code in CASES.items():
+    results[name] = measure(code, args.repeat)
+    print(name, results[name], file=sys.stderr)
+  print(json.dumps({'benchmark': 'importtime', 'python': sys.version.split()[0],
+                    'results': results}, indent=2))
+
+def cli():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,
+  )
+  parser.add_argument('--repeat', type=int, default=5, help="Best of N runs")
+  args = parser.parse_args()
+  main(args)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(cli())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+page build time against the number of stateful buttons
+
+Builds the '/' page for synthetic configs with N buttons, every button having
+a state command. Compares state-concurrency = 1 (one state command after
+another, like before the state engine) with the configured concurrency.
+
+  python benchmarks/page_build.py
+  python benchmarks/page_build.py --buttons 10 60 120 --concurrency 16
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import time
+import tempfile
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+import controldeck
+
+def config_make(buttons, concurrency, duplicates, delay) -> ConfigParser:
+  config = ConfigParser(strict=False)
+  config['default'] = {'state-concurrency': str(concurrency)}
+  for i in range(buttons):
+    # every `duplicates` buttons share the same state command
+    config[f"bench:{i // 10}.button.b{i}"] = {
+      'command': 'true',
+      'state-command': f"sleep {delay}; echo {i // duplicates}",
+      'state-alt': '0',
+    }
+  return config
+
+def build_time(config, repeat) -> float:
+  with tempfile.NamedTemporaryFile('w', suffix='.conf', delete=False) as file:
+    config.write(file)
+  controldeck.ConfigCache.conf = file.name
+  request = SimpleNamespace(query_params={})
+  best = None
+  for _ in range(repeat):
+    # every build runs the state commands, not reused from the StateStore
+    controldeck.StateStore.values, controldeck.StateStore.times = {}, {}
+    controldeck.StateStore.semaphore = None  # bound to the event loop of the previous run
+    t = time.perf_counter()
+    asyncio.run(controldeck.application(request))
+    dt = time.perf_counter() - t
+    best = dt if best is None else min(best, dt)
+  os.remove(file.name)
+  return best
+
+def main(args):
+  results = []
+  for buttons in args.buttons:
+    row = {'buttons': buttons}
+    for concurrency in (1, args.concurrency):
+      config = config_make(buttons, concurrency, args.duplicates, args.delay)
+      row[f"concurrency_{concurrency}_s"] = round(build_time(config, args.repeat), 4)
+    results.append(row)
+    print(row, file=sys.stderr)
+  print(json.dumps({'benchmark': 'page_build', 'delay': args.delay,
+                    'duplicates': args.duplicates, 'results': results}, indent=2))
+
+def cli():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,
+  )
+  parser.add_argument('--buttons', nargs='+', type=int, default=[10, 30, 60, 120],
+                      help="Number of stateful buttons per run")
+  parser.add_argument('--concurrency', type=int, default=8,
+                      help="state-concurrency to compare with sequential state commands")
+  parser.add_argument('--duplicates', type=int, default=2,
+                      help="Number of buttons sharing the same state command")
+  parser.add_argument('--delay', type=float, default=0.01,
+                      help="Runtime in seconds of every state command")
+  parser.add_argument('--repeat', type=int, default=3, help="Best of N runs")
+  args = parser.parse_args()
+  main(args)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(cli())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+"""
+benchmark suite, prints the results as JSON
+
+  widget_load    parse synthetic configs with 10 to 5000 button, slider and
+                 sink sections into the widget dict
+  page_build     build the whole '/' page (all tabs) for the same configs
+  spawn          click-to-spawn latency of process() and process_async(), the
+                 time until a stub script runs its first command
+  volume_refresh PulseStore.refresh with a fake pactl (benchmarks/bin) on PATH
+  state_fanout   1 to 20 pages opened at once with 100 state commands, the
+                 number of state commands run stays the same (StateStore)
+
+  python benchmarks/suite.py > before.json
+  python benchmarks/suite.py --sections 10 100 > after.json
+  python benchmarks/compare.py before.json after.json
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+os.environ['PATH'] = os.path.join(BENCH_DIR, 'bin') + os.pathsep + os.environ['PATH']  # fake pactl
+import controldeck
+
+def config_make(sections, state=False) -> ConfigParser:
+  """synthetic config: 70 % buttons, 20 % sliders, 10 % sinks, 10 widgets
+  per row and 5 rows per tab"""
+  config = ConfigParser(strict=False)
+  config['default'] = {'pactl-subscribe': 'False', 'config-watch': 'False'}
+  for i in range(sections):
+    head = f"t{i // 50}:{i // 10 % 5}."
+    kind = i % 10
+    if kind < 7:
+      config[head + f"button.b{i}"] = {
+        'command': f"echo {i}",
+        'icon': 'play_arrow',
+        **({'state-command': f"echo {i % 7}", 'state-alt': '0'} if state else {}),
+      }
+    elif kind < 9:
+      config[head + f"slider.s{i}"] = {
+        'command': f"echo {{value}}",
+        'min': '0', 'max': '100', 'step': '1',
+        **({'state-command': 'echo 50'} if state else {}),
+      }
+    else:
+      config[head + f"sink.sink{i}"] = {'description': f"sink {i}"}
+  return config
+
+def fake_pactl(directory, sinks) -> None:
+  "data of the fake pactl in benchmarks/bin"
+  volume = {'front-left': {'value_percent': '40%'}, 'front-right': {'value_percent': '40%'}}
+  data = {
+    'sinks': [{'index': i, 'name': f"sink{i * 10 + 9}", 'mute': False, 'volume': volume}
+              for i in range(sinks)],
+    'sources': [],
+    'sink-inputs': [],
+  }
+  for key, value in data.items():
+    with open(os.path.join(directory, key + '.json'), 'w') as file:
+      json.dump(value, file)
+  os.environ['CONTROLDECK_FAKE_PACTL'] = directory
+
+def timing(func, repeat) -> dict:
+  "seconds of repeated calls of func"
+  times = []
+  for _ in range(repeat):
+    t = time.perf_counter()
+    func()
+    times.append(time.perf_counter() - t)
+  return {'min_s': round(min(times), 6), 'median_s': round(statistics.median(times), 6)}
+
+def bench_widget_load(config, repeat) -> dict:
+  return timing(lambda: controldeck.widget_load(config), repeat)
+
+def bench_page_build(config, directory, repeat) -> dict:
+  config_file = os.path.join(directory, 'controldeck.conf')
+  with open(config_file, 'w') as file:
+    config.write(file)
+  controldeck.ConfigCache.conf = config_file
+  controldeck.PulseStore.snapshot = controldeck.PulseStore.snapshot._replace(time=0)
+  request = SimpleNamespace(query_params={})
+  async def build():
+    # the whole page, application builds only the first tab of [all]
+    controldeck.StateStore.semaphore = None  # bound to the event loop of the previous run
+    wp = await controldeck.application(request)
+    await controldeck.tab_build(wp, list(wp.widget_dict))
+  res = timing(lambda: asyncio.run(build()), repeat)
+  for wp in controldeck.main_pages():  # do not let pages pile up
+    controldeck.WebPage.instances.pop(wp.page_id, None)
+  return res
+
+def bench_spawn(directory, repeat) -> dict:
+  "from calling process() until the stub script runs"
+  stub = os.path.join(directory, 'stub.sh')
+  stamp = os.path.join(directory, 'stamp')
+  with open(stub, 'w') as file:
+    file.write('#!/bin/bash\necho "$EPOCHREALTIME" > "$1"\n')
+  os.chmod(stub, 0o755)
+  def wait_stamp():
+    while True:
+      try:
+        with open(stamp) as file:
+          text = file.read().strip()
+        if text:
+          os.remove(stamp)
+          return float(text.replace(',', '.'))
+      except FileNotFoundError:
+        pass
+      time.sleep(0.0005)
+  res = {}
+  latencies = []
+  for _ in range(repeat):
+    t = time.time()
+    controldeck.process(f"{stub} {stamp}", shell=True, output=False)
+    latencies.append(wait_stamp() - t)
+  res['process'] = {'min_s': round(min(latencies), 6), 'median_s': round(statistics.median(latencies), 6)}
+  async def spawn_async():
+    latencies = []
+    for _ in range(repeat):
+      t = time.time()
+      proc = await controldeck.process_async(f"{stub} {stamp}", shell=True, output=False)
+      latencies.append(wait_stamp() - t)
+      await proc.wait()
+    return latencies
+  latencies = asyncio.run(spawn_async())
+  res['process_async'] = {'min_s': round(min(latencies), 6), 'median_s': round(statistics.median(latencies), 6)}
+  return res
+
+def bench_state_fanout(directory, pages) -> dict:
+  "open pages at once, a fresh StateStore each, state commands run and time"
+  config_file = os.path.join(directory, 'controldeck.conf')
+  with open(config_file, 'w') as file:
+    config_make(100, state=True).write(file)
+  controldeck.ConfigCache.conf = config_file
+  controldeck.StateStore.values, controldeck.StateStore.times = {}, {}
+  controldeck.StateStore.semaphore = None
+  probes = controldeck.StateStore.probes
+  request = SimpleNamespace(query_params={})
+  async def build():
+    await asyncio.gather(*[controldeck.application(request) for _ in range(pages)])
+  t = time.perf_counter()
+  asyncio.run(build())
+  res = {'pages': pages, 'probes': controldeck.StateStore.probes - probes,
+         'time_s': round(time.perf_counter() - t, 6)}
+  for wp in controldeck.main_pages():
+    controldeck.WebPage.instances.pop(wp.page_id, None)
+  return res
+
+def bench_volume_refresh(repeat) -> dict:
+  return timing(lambda: asyncio.run(controldeck.PulseStore.refresh()), repeat)
+
+def version() -> dict:
+  with open(os.path.join(BENCH_DIR, '..', 'VERSION')) as file:
+    res = {'version': file.read().strip()}
+  try:
+    res['git'] = subprocess.run(
+      ['git', 'describe', '--always', '--dirty'], cwd=BENCH_DIR,
+      capture_output=True, text=True).stdout.strip()
+  except OSError:
+    pass
+  return res
+
+def main(args):
+  results = {'widget_load': [], 'page_build': []}
+  with tempfile.TemporaryDirectory() as directory:
+    for sections in args.sections:
+      config = config_make(sections, state=args.state)
+      fake_pactl(directory, sections // 10)
+      results['widget_load'].append({'sections': sections, **bench_widget_load(config, args.repeat)})
+      if sections <= args.max_page:
+        results['page_build'].append({'sections': sections, **bench_page_build(config, directory, args.repeat)})
+      print(f"{sections} sections done", file=sys.stderr)
+    results['spawn'] = bench_spawn(directory, args.repeat * 10)
+    results['state_fanout'] = [bench_state_fanout(directory, i) for i in (1, 5, 20)]
+    fake_pactl(directory, args.sinks)
+    results['volume_refresh'] = {'sinks': args.sinks, **bench_volume_refresh(args.repeat * 10)}
+  print(json.dumps({
+    'benchmark': 'suite',
+    **version(),
+    'python': platform.python_version(),
+    'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    'state': args.state,
+    'results': results,
+  }, indent=2))
+
+def cli():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,
+  )
+  parser.add_argument('--sections', nargs='+', type=int, default=[10, 100, 1000, 5000],
+                      help="Number of config sections per run")
+  parser.add_argument('--max-page', type=int, default=1000,
+                      help="Largest number of sections to build a page for")
+  parser.add_argument('--sinks', type=int, default=20, help="Number of fake sinks for volume_refresh")
+  parser.add_argument('--state', action='store_true', help="Give buttons and sliders a state command")
+  parser.add_argument('--repeat', type=int, default=5, help="Runs per measurement")
+  args = parser.parse_args()
+  main(args)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(cli())
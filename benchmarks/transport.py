@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+"""
+loopback tcp against the unix domain socket listener ([default] socket)
+
+Starts a server listening on both and measures over each
+
+  page_load      GET / on a new connection, as a page reload
+  request_rtt    GET /healthz on a kept alive connection
+  websocket_rtt  websocket ping / pong on the page websocket, needs the
+                 websockets package (used by uvicorn)
+
+  python benchmarks/transport.py
+  python benchmarks/transport.py --repeat 500 --buttons 200
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import tempfile
+import time
+from configparser import ConfigParser
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, ROOT)
+from controldeck_core import http_connection
+
+def config_make(buttons) -> ConfigParser:
+  config = ConfigParser(strict=False)
+  config['default'] = {'config-watch': 'False', 'pactl-subscribe': 'False'}
+  for i in range(buttons):
+    config[f"bench:{i // 10}.button.b{i}"] = {'command': 'true'}
+  return config
+
+def stats(times) -> dict:
+  return {'min_s': round(min(times), 6), 'median_s': round(statistics.median(times), 6)}
+
+def wait_ready(port, path, timeout=30.0) -> bool:
+  end = time.monotonic() + timeout
+  while time.monotonic() < end:
+    conn = http_connection('127.0.0.1', port, path, timeout=0.5)
+    try:
+      conn.request('GET', '/healthz')
+      if conn.getresponse().status == 200:
+        return True
+    except OSError:
+      pass
+    finally:
+      conn.close()
+    time.sleep(0.1)
+  return False
+
+def bench_page_load(port, path, repeat) -> dict:
+  times = []
+  for _ in range(repeat):
+    t = time.perf_counter()
+    conn = http_connection('127.0.0.1', port, path, timeout=5)
+    conn.request('GET', '/')
+    conn.getresponse().read()
+    conn.close()
+    times.append(time.perf_counter() - t)
+  return stats(times)
+
+def bench_request_rtt(port, path, repeat) -> dict:
+  conn = http_connection('127.0.0.1', port, path, timeout=5)
+  times = []
+  for _ in range(repeat):
+    t = time.perf_counter()
+    conn.request('GET', '/healthz')
+    conn.getresponse().read()
+    times.append(time.perf_counter() - t)
+  conn.close()
+  return stats(times)
+
+async def bench_websocket_rtt(port, path, repeat) -> dict:
+  import websockets
+  if path:
+    ws = await websockets.unix_connect(path, 'ws://localhost/')
+  else:
+    ws = await websockets.connect(f"ws://127.0.0.1:{port}/")
+  times = []
+  try:
+    for _ in range(repeat):
+      t = time.perf_counter()
+      await (await ws.ping())
+      times.append(time.perf_counter() - t)
+  finally:
+    await ws.close()
+  return stats(times)
+
+def main(args):
+  results = {}
+  with tempfile.TemporaryDirectory() as directory:
+    config_file = os.path.join(directory, 'controldeck.conf')
+    with open(config_file, 'w') as file:
+      config_make(args.buttons).write(file)
+    path = os.path.join(directory, 'controldeck.sock')
+    server = subprocess.Popen(
+      [sys.executable, os.path.join(ROOT, 'controldeck.py'), f"--config={config_file}",
+       '--host=127.0.0.1', f"--port={args.port}", f"--socket={path}"],
+      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+      if not (wait_ready(args.port, '') and wait_ready(args.port, path)):
+        print("server did not get ready", file=sys.stderr)
+        return 1
+      for name, socket_path in (('tcp', ''), ('uds', path)):
+        res = {
+          'page_load': bench_page_load(args.port, socket_path, args.repeat),
+          'request_rtt': bench_request_rtt(args.port, socket_path, args.repeat),
+        }
+        try:
+          res['websocket_rtt'] = asyncio.run(bench_websocket_rtt(args.port, socket_path, args.repeat))
+        except ImportError:
+          print("websocket_rtt skipped, websockets is not installed", file=sys.stderr)
+        results[name] = res
+        print(name, res, file=sys.stderr)
+    finally:
+      server.terminate()
+      server.wait()
+  print(json.dumps({'benchmark': 'transport', 'buttons': args.buttons, 'repeat': args.repeat,
+                    'results': results}, indent=2))
+  return 0
+
+def cli():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,
+  )
+  parser.add_argument('--buttons', type=int, default=60, help="Number of buttons on the page")
+  parser.add_argument('--port', type=int, default=8765, help="TCP port of the benchmark server")
+  parser.add_argument('--repeat', type=int, default=200, help="Runs per measurement")
+  args = parser.parse_args()
+  return main(args)
+
+if __name__ == '__main__':
+  sys.exit(cli())
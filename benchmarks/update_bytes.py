@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+websocket bytes sent for a button state change
+
+before: the whole page is sent (page_update), as done by returning None from
+        the update handler or calling wp.update()
+after:  only the changed button is sent (component_update), see
+        buttons_update
+
+  python benchmarks/update_bytes.py
+  python benchmarks/update_bytes.py --buttons 10 60 240
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import tempfile
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+import controldeck
+
+class Socket():
+  "counts the bytes of the messages sent to a browser tab"
+  def __init__(self):
+    self.bytes = 0
+  async def send_text(self, text):
+    self.bytes += len(text.encode('utf-8'))
+  async def send_json(self, data):
+    await self.send_text(json.dumps(data, separators=(',', ':')))
+
+def config_make(buttons, state_file) -> ConfigParser:
+  config = ConfigParser(strict=False)
+  for i in range(buttons):
+    config[f"bench:{i // 10}.button.b{i}"] = {
+      'command': 'true',
+      'state-command': f"cat {state_file}",
+      'state-alt': 'on',
+      'description-alt': f"b{i} on",
+    }
+  return config
+
+async def measure(buttons) -> dict:
+  with tempfile.TemporaryDirectory() as tmp:
+    state_file = os.path.join(tmp, 'state')
+    with open(state_file, 'w') as file:
+      file.write('off')
+    config_file = os.path.join(tmp, 'controldeck.conf')
+    with open(config_file, 'w') as file:
+      config_make(buttons, state_file).write(file)
+    controldeck.ConfigCache.conf = config_file
+    wp = await controldeck.application(SimpleNamespace(query_params={}))
+    socket = Socket()
+    controldeck.WebPage.sockets[wp.page_id] = {0: socket}
+    button = wp.widgets['bench:0.button.b0'][0]
+
+    # before: change one button, send the page
+    button.set_state('on')
+    await socket.send_json({'type': 'page_update', 'data': wp.build_list()})
+    before = socket.bytes
+
+    # after: change one button, send the button
+    socket.bytes = 0
+    button.set_state('off')
+    await controldeck.component_update(wp, button)
+    after = socket.bytes
+    del controldeck.WebPage.sockets[wp.page_id]
+  return {'buttons': buttons, 'page_update_bytes': before, 'component_update_bytes': after}
+
+def main(args):
+  results = []
+  for buttons in args.buttons:
+    row = asyncio.run(measure(buttons))
+    results.append(row)
+    print(row, file=sys.stderr)
+  print(json.dumps({'benchmark': 'update_bytes', 'results': results}, indent=2))
+
+def cli():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,
+  )
+  parser.add_argument('--buttons', nargs='+', type=int, default=[10, 60, 240],
+                      help="Number of stateful buttons on the page")
+  args = parser.parse_args()
+  main(args)
+  return 0
+
+if __name__ == '__main__':
+  sys.exit(cli())
@@ -17,28 +17,56 @@ import sys
 import os
 import shutil
 import shlex
+import signal
+import asyncio
 import subprocess
-from configparser import ConfigParser
 import re
 import json
 import time
 import datetime
-import argparse
 import textwrap
 import threading
+import ctypes
+import ctypes.util
+import base64
+import hashlib
+import bisect
+import heapq
+import random
+import io
+import tempfile
+import cProfile
+import pstats
+import socket
+from collections import namedtuple
+from types import MappingProxyType
 from addict import Dict  # also used in justpy
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response  # starlette is used by justpy
+import uvicorn  # also used in justpy
+
+from controldeck_core import (
+  APP_NAME,
+  ASSET_DIR,
+  CACHE_DIR,
+  CONFIG_DIR,
+  CONFIG_FILE,
+  CONFIG_FILE_NAME,
+  STATIC_DIR,
+  command_run,
+  config_load,
+  config_socket,
+  config_path,
+  kill_process,
+  process,
+  process_async,
+)
+import controldeck_core
 
-APP_NAME = "ControlDeck"
 COLOR_PRIME = "blue-grey-8"        # "blue-grey-7" "blue-grey-8" 'light-blue-9'
 COLOR_PRIME_TEXT = "blue-grey-7"
 COLOR_SELECT = "light-blue-9"
 DEBUG = False
-
-CONFIG_DIR = os.path.join(os.path.expanduser("~"), '.config', APP_NAME.lower())
-CONFIG_FILE_NAME = APP_NAME.lower() + '.conf'
-CONFIG_FILE = os.path.join(CONFIG_DIR, CONFIG_FILE_NAME)
-CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', APP_NAME.lower())
-STATIC_DIR = os.path.join(CACHE_DIR, 'static')
+STATE_DELAY = 1.0  # max seconds to wait for a clicked command before re-checking the state
 
 # justpy config overwrite
 # NEEDS to be done BEFORE loading justpy but AFTER jpcore.justpy_config.JpConfig
@@ -94,70 +122,495 @@ from justpy import (
 def tohtml(text):
   return text.replace("\n", "<br>")
 
-# output good for short / very fast processes, this will block until done
-# callback good for long processes
-def process(
-    command_line, shell=False, stdout=subprocess.PIPE,
-    stderr=subprocess.STDOUT, output=True, callback=None):
-  try:
-    # with shell=True args can be a string
-    # detached process https://stackoverflow.com/a/65900355/992129 start_new_session
-    # https://docs.python.org/3/library/subprocess.html#popen-constructor
-    # reading the output blocks also the process -> for buttons use output=False
-    # maybe https://stackoverflow.com/questions/375427/a-non-blocking-read-on-a-subprocess-pipe-in-python
-    # print(command_line)
-    if shell:
-      # shell mode for 'easy' program strings with pipes
-      # e.g. DISPLAY=:0 wmctrl -xl | grep emacs.Emacs && DISPLAY=:0 wmctrl -xa emacs.Emacs || DISPLAY=:0 emacs &
-      args = command_line
-    else:
-      args = shlex.split(command_line)
-    # print(args)
-    popen_args = (args, )
-    popen_kwargs = dict(
-      stdout=stdout,
-      stderr=stderr,
-      shell=shell,
-      start_new_session=True,
+def main_pages() -> list:
+  "open controldeck pages, see application"
+  return [i for i in list(WebPage.instances.values()) if getattr(i, 'page_type', '') == 'main']
+
+class Histogram():
+  """
+  prometheus histogram with fixed buckets, optionally by one label
+
+  Usage:
+    h = Histogram('name_seconds', 'help text', (0.01, 0.1, 1), label='button')
+    h.observe(0.05, 'a:1.button.x')
+  """
+  def __init__(self, name, help, buckets, label=None):
+    self.name = name
+    self.help = help
+    self.buckets = tuple(buckets)
+    self.label = label
+    self.values = {}          # label value: [counts per bucket (+Inf last), sum]
+
+  def observe(self, value, label_value='') -> None:
+    if label_value not in self.values:
+      self.values[label_value] = [[0] * (len(self.buckets) + 1), 0.0]
+    counts = self.values[label_value]
+    counts[0][bisect.bisect_left(self.buckets, value)] += 1
+    counts[1] += value
+
+  def render(self) -> list:
+    lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+    for label_value, (counts, total) in self.values.items():
+      labels = f'{self.label}="{metric_escape(label_value)}",' if self.label else ''
+      cumulative = 0
+      for bound, count in zip(self.buckets + ('+Inf',), counts):
+        cumulative += count
+        lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+      labels = f'{{{labels[:-1]}}}' if labels else ''
+      lines.append(f"{self.name}_sum{labels} {total:.6f}")
+      lines.append(f"{self.name}_count{labels} {cumulative}")
+    return lines
+
+def metric_escape(value) -> str:
+  return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics():
+  """
+  process wide metrics, served in the prometheus text format by /metrics
+
+  Usage:
+    Metrics.page_build.observe(seconds)
+    Metrics.render()
+  """
+  TIMES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+  page_build = Histogram(
+    'controldeck_page_build_seconds', 'Build time of the main page (application)', TIMES)
+  state_check = Histogram(
+    'controldeck_state_check_seconds', 'Run time of one state check cycle (StateEngine)', TIMES)
+  process_spawn = Histogram(
+    'controldeck_process_spawn_seconds', 'Time to start the command of a button', TIMES, 'button')
+  process_duration = Histogram(
+    'controldeck_process_duration_seconds', 'Run time of the command of a button until it exited',
+    TIMES + (30, 60, 300, 900, 3600), 'button')
+  volume_refresh = Histogram(
+    'controldeck_volume_refresh_seconds', 'Time to fetch the pulseaudio state (PulseStore.refresh)', TIMES)
+  websocket_bytes = Histogram(
+    'controldeck_websocket_message_bytes', 'Size of the websocket messages sent, by message type',
+    (256, 1024, 4096, 16384, 65536, 262144, 1048576), 'type')
+
+  @classmethod
+  def render(cls) -> str:
+    lines = []
+    for histogram in (cls.page_build, cls.state_check, cls.process_spawn,
+                      cls.process_duration, cls.volume_refresh, cls.websocket_bytes):
+      lines += histogram.render()
+    gauges = (
+      ('controldeck_pages', 'Open main pages', len(main_pages())),
+      ('controldeck_processes', 'Running processes started by buttons', len(Supervisor.running())),
+      ('controldeck_config_version', 'Config version, incremented on every (re)load', ConfigCache.version),
     )
-    if callback is not None:
-      def run_in_thread(callback, popen_args, popen_kwargs):
-        proc = subprocess.Popen(*popen_args, **popen_kwargs)
-        proc.wait()
-        callback()
-      thread = threading.Thread(
-        target=run_in_thread,
-        args=(callback, popen_args, popen_kwargs))
-      thread.start()
-    else:
-      # proc = subprocess.Popen(args, stdout=stdout, stderr=stderr, shell=shell, start_new_session=True)
-      proc = subprocess.Popen(*popen_args, **popen_kwargs)
-      if output:
-        res = proc.stdout.read().decode("utf-8").rstrip()
-        proc.kill()  # does not help to unblock
-        # print(res)
-        return res
-  except Exception as e:
-    print(f"process '{e}' failed!")
-
-def config_load(conf=''):
-  config = ConfigParser(strict=False)
-  # fist check if file is given
-  if conf:
-    config_file = conf
-  else:
-    # check if config file is located at the script's location
-    config_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), CONFIG_FILE_NAME)  # realpath; resolve symlink
-    if not os.path.exists(config_file):
-      # if not, use the file inside .config
-      os.makedirs(CONFIG_DIR, exist_ok=True)
-      config_file = CONFIG_FILE
-  try:
-    config.read(os.path.expanduser(config_file))
-  except Exception as e:
-    print(f"{e}")
-  #print(config.sections())
-  return config
+    for name, help, value in gauges:
+      lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"]
+    counters = (
+      ('controldeck_config_cache_hits_total', 'Config loads served from the cache (ConfigCache)', ConfigCache.hits),
+      ('controldeck_config_reloads_total', 'Config loads parsing the file (ConfigCache)', ConfigCache.reloads),
+      ('controldeck_state_probes_total', 'State commands run, for all pages (StateStore)', StateStore.probes),
+      ('controldeck_state_cache_hits_total', 'State outputs reused within their state-interval', StateStore.hits),
+      ('controldeck_state_polls_total', 'State commands polled in the background (StateScheduler)', StateScheduler.probes),
+      ('controldeck_state_polls_skipped_total', 'Polls skipped, the previous probe still running', StateScheduler.skipped),
+    )
+    for name, help, value in counters:
+      lines += [f"# HELP {name} {help}", f"# TYPE {name} counter", f"{name} {value}"]
+    return '\n'.join(lines) + '\n'
+
+async def page_update(wp) -> int:
+  """push the whole page wp to its browser tabs (wp.update()), returns the
+  number of bytes sent. the message is serialized a second time for its
+  size (without the page options), only if a browser tab is connected"""
+  sockets = len(WebPage.sockets.get(wp.page_id, {}))
+  size = 0
+  if sockets:
+    size = len(json.dumps({'type': 'page_update', 'data': wp.build_list()},
+                          separators=(',', ':'), default=str).encode('utf-8'))
+    for _ in range(sockets):
+      Metrics.websocket_bytes.observe(size, 'page_update')
+  await wp.update()
+  return size * sockets
+
+async def component_update(wp, component) -> int:
+  """push only the component to the browser tabs showing the page wp instead
+  of the whole page, returns the number of bytes sent"""
+  if component.id is None:  # not addressable, send the whole page
+    return await page_update(wp)
+  text = json.dumps({'type': 'component_update', 'data': component.convert_object_to_dict()},
+                    separators=(',', ':'))
+  sent = 0
+  for websocket in list(WebPage.sockets.get(wp.page_id, {}).values()):
+    try:
+      await websocket.send_text(text)
+      sent += len(text.encode('utf-8'))
+      Metrics.websocket_bytes.observe(len(text.encode('utf-8')), 'component_update')
+    except Exception as e:
+      print(f"component update failed: {e}")
+  return sent
+
+class RingBuffer():
+  """
+  keeps the last `limit` bytes written, e.g. of a streamed command output
+
+  Usage:
+    buffer = RingBuffer()
+    buffer.write(chunk)
+    buffer.text()
+  """
+  limit = 64 * 1024
+
+  def __init__(self, limit=None):
+    if limit is not None:
+      self.limit = limit
+    self.data = bytearray()
+    self.total = 0            # bytes written since the last clear
+
+  def write(self, data) -> None:
+    self.total += len(data)
+    self.data += data
+    if len(self.data) > self.limit:
+      del self.data[:len(self.data) - self.limit]
+
+  def clear(self) -> None:
+    self.data.clear()
+    self.total = 0
+
+  def text(self) -> str:
+    # the cut might split a multibyte character at the front
+    return self.data.decode('utf-8', errors='replace')
+
+Job = namedtuple('Job', ['pid', 'owner', 'command', 'start', 'timeout', 'proc'])
+
+class Supervisor():
+  """
+  keeps track of the processes started by buttons
+
+  Every process is registered with its owner (the config section name of
+  the button) and reaped in the background as soon as it exits (asyncio
+  child watcher, pidfd where available). A process running longer than its
+  timeout gets SIGTERM and after `grace` seconds SIGKILL on its process
+  group. A job is kept as long as its process group is alive, e.g. for
+  an application started in the background with `&`.
+
+  Usage:
+    proc = await Supervisor.spawn(command_line, owner, timeout=None)
+    Supervisor.signal(owner, 'SIGTERM')  # e.g. command-alt = SIGTERM
+    Supervisor.list()
+  """
+  grace = 3.0                 # seconds between SIGTERM and SIGKILL
+  jobs = {}                   # pid (= process group id): Job
+  spawned = 0
+  reaped = 0
+  timeouts = 0
+
+  @classmethod
+  async def spawn(cls, command_line, owner='', timeout=None, stream=False):
+    "start a shell command, returns the asyncio process or None"
+    start = time.time()
+    t = time.perf_counter()
+    proc = await process_async(command_line, shell=True, output=stream, stream=stream)
+    if proc is None:
+      return None
+    Metrics.process_spawn.observe(time.perf_counter() - t, owner)
+    cls.spawned += 1
+    cls.jobs[proc.pid] = Job(proc.pid, owner, command_line, start, timeout, proc)
+    asyncio.create_task(cls.reap(proc, timeout))
+    return proc
+
+  @classmethod
+  async def reap(cls, proc, timeout=None) -> None:
+    try:
+      await asyncio.wait_for(proc.wait(), timeout)
+    except asyncio.TimeoutError:
+      print(f"process '{cls.jobs[proc.pid].command}' timed out after {timeout} s!")
+      cls.timeouts += 1
+      cls.killpg(proc.pid, signal.SIGTERM)
+      try:
+        await asyncio.wait_for(proc.wait(), cls.grace)
+      except asyncio.TimeoutError:
+        kill_process(proc)
+        await proc.wait()
+    cls.reaped += 1
+    job = cls.jobs.get(proc.pid)
+    if job is not None:
+      Metrics.process_duration.observe(time.time() - job.start, job.owner)
+    if not cls.alive(proc.pid):
+      cls.jobs.pop(proc.pid, None)
+
+  @staticmethod
+  def killpg(pgid, sig) -> bool:
+    try:
+      os.killpg(pgid, sig)
+      return True
+    except (ProcessLookupError, PermissionError):
+      return False
+
+  @classmethod
+  def alive(cls, pgid) -> bool:
+    "the process group still has a process"
+    return cls.killpg(pgid, 0)
+
+  @staticmethod
+  def signal_number(name):
+    """signal number of a name like SIGTERM, None if it is no signal. only
+    names with the SIG prefix, a command like `stop` or `kill` is run"""
+    name = name.strip()
+    if not name.startswith('SIG'):
+      return None
+    sig = getattr(signal, name, None)
+    return sig if isinstance(sig, signal.Signals) else None
+
+  @classmethod
+  def running(cls, owner=None) -> list:
+    "jobs with a living process group, of the owner or all"
+    for pid in [i for i, j in cls.jobs.items() if j.proc.returncode is not None and not cls.alive(i)]:
+      del cls.jobs[pid]
+    return [j for j in cls.jobs.values() if owner is None or j.owner == owner]
+
+  @classmethod
+  def signal(cls, owner, name) -> int:
+    "send the signal name to the process groups of owner, returns their number"
+    sig = cls.signal_number(name)
+    jobs = [j for j in cls.running(owner) if cls.killpg(j.pid, sig)]
+    if DEBUG:
+      print(f"[DEBUG.jobs] {name} to {[j.pid for j in jobs]} of {owner}")
+    return len(jobs)
+
+  @classmethod
+  def list(cls) -> list:
+    now = time.time()
+    return [{'pid': j.pid, 'owner': j.owner, 'command': j.command,
+             'runtime': round(now - j.start, 1), 'timeout': j.timeout,
+             'returncode': j.proc.returncode}
+            for j in cls.running()]
+
+  @classmethod
+  def stats(cls) -> dict:
+    return {'running': len(cls.running()), 'spawned': cls.spawned,
+            'reaped': cls.reaped, 'timeouts': cls.timeouts}
+
+class ShellWorker():
+  """
+  long running /bin/sh running one command after another
+
+  A command is sent as `eval` of the quoted command line, its output
+  (stdout and stderr) is framed by a line with a per worker marker and the
+  exit status. stdin of the command is /dev/null.
+  """
+  limit = 2**20               # max bytes of output
+
+  def __init__(self):
+    self.proc = None
+    self.killed = False         # the returncode is set only once the shell is reaped
+    self.marker = f"--controldeck-{os.urandom(8).hex()}--"
+
+  @property
+  def alive(self) -> bool:
+    return self.proc is not None and self.proc.returncode is None and not self.killed
+
+  async def start(self) -> None:
+    self.proc = await asyncio.create_subprocess_exec(
+      '/bin/sh', stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+      stderr=subprocess.DEVNULL, start_new_session=True, limit=self.limit)
+
+  async def run(self, command_line, timeout=None) -> tuple:
+    "returns (output, exit status)"
+    script = (f"out=$(eval {shlex.quote(command_line)} 2>&1 </dev/null); rc=$?\n"
+              f"printf '%s\\n{self.marker} %s\\n' \"$out\" \"$rc\"\n")
+    self.proc.stdin.write(script.encode('utf-8'))
+    async def read():
+      await self.proc.stdin.drain()
+      data = await self.proc.stdout.readuntil(f"\n{self.marker} ".encode())
+      status = await self.proc.stdout.readline()
+      return data[:-len(self.marker)-2].decode('utf-8', errors='replace').rstrip(), int(status)
+    return await asyncio.wait_for(read(), timeout)
+
+  def kill(self) -> None:
+    if self.alive:
+      kill_process(self.proc)
+      self.killed = True
+
+class ShellPool():
+  """
+  pool of ShellWorkers for state commands, saves the fork and exec of a new
+  shell from the (large) server process for every state check. Workers are
+  started on first use, a crashed or timed out worker is replaced.
+  `size` 0 disables the pool (see [default] shell-pool).
+
+  Usage:
+    ShellPool.configure(4)
+    output, status = await ShellPool.run('pgrep -x mpv')
+  """
+  size = 0
+  timeout = 10.0              # seconds per command
+  idle = None                 # asyncio.Queue of workers, None for a not yet started one
+
+  @classmethod
+  def configure(cls, size) -> None:
+    if size == cls.size and (cls.idle is not None or size == 0):
+      return
+    cls.close()
+    cls.size = max(0, size)
+    cls.idle = asyncio.Queue() if cls.size else None
+    for _ in range(cls.size):
+      cls.idle.put_nowait(None)
+
+  @classmethod
+  def from_config(cls, config) -> None:
+    "configure the pool with [default] shell-pool, at startup and on config changes"
+    try:
+      cls.configure(config.getint('default', 'shell-pool', fallback=0))
+    except ValueError as e:
+      cls.configure(0)
+      print(f"Error shell-pool: {e}. fallback to: 0")
+
+  @classmethod
+  def close(cls) -> None:
+    while cls.idle is not None and not cls.idle.empty():
+      worker = cls.idle.get_nowait()
+      if worker is not None:
+        worker.kill()
+    cls.idle = None
+
+  @classmethod
+  async def run(cls, command_line, timeout=None) -> tuple:
+    "returns (output, exit status), (None, None) if the command failed or timed out"
+    idle = cls.idle
+    worker = await idle.get()
+    if idle is not cls.idle:
+      # resized while waiting: wake the next waiter of the old pool, run in the new one
+      idle.put_nowait(None)
+      if worker is not None:
+        worker.kill()
+      if cls.idle is None:
+        return await process_async(command_line, shell=True, timeout=timeout or cls.timeout), None
+      return await cls.run(command_line, timeout)
+    try:
+      if worker is None or not worker.alive:
+        worker = ShellWorker()
+        await worker.start()
+      return await worker.run(command_line, timeout or cls.timeout)
+    except asyncio.TimeoutError:
+      print(f"process '{command_line}' timed out after {timeout or cls.timeout} s!")
+      worker.kill()
+    except asyncio.CancelledError:
+      worker.kill()
+      raise
+    except Exception as e:
+      print(f"shell worker failed running '{command_line}': {e}")
+      worker.kill()
+    finally:
+      if idle is cls.idle:
+        idle.put_nowait(worker if worker is not None and worker.alive else None)
+      else:
+        # pool was resized, a waiter of the old pool takes the free slot
+        if worker is not None:
+          worker.kill()
+        idle.put_nowait(None)
+    return None, None
+
+async def state_run(command_line):
+  """run a state command, in the ShellPool if enabled, returns its output or
+  None. a command still running after ShellPool.timeout seconds is killed"""
+  if ShellPool.idle is not None:
+    output, _ = await ShellPool.run(command_line)
+    return output
+  return await process_async(command_line, shell=True, timeout=ShellPool.timeout)
+
+class Coalescer():
+  """
+  runs the newest submitted job of a widget, at most one at a time
+
+  A job submitted while another one is running replaces the waiting job, a
+  slider drag runs the first and the last value instead of every step.
+  `interval` is the minimum time in seconds between the start of two jobs,
+  the class attribute is the default (see [default] slider-interval).
+
+  Usage:
+    coalescer = Coalescer()
+    coalescer.submit(command_run, 'pactl set-sink-volume sink 50%')
+  """
+  interval = 0.0
+
+  def __init__(self, interval=None):
+    if interval is not None:
+      self.interval = interval
+    self.pending = None       # (async function, args) of the newest waiting job
+    self.task = None
+    self.last_start = 0.0
+    self.received = 0         # submitted jobs
+    self.executed = 0         # jobs actually run
+
+  def submit(self, func, *args) -> None:
+    self.received += 1
+    self.pending = (func, args)
+    if self.task is None or self.task.done():
+      self.task = asyncio.create_task(self.run())
+
+  async def run(self) -> None:
+    while self.pending is not None:
+      wait = self.last_start + self.interval - time.monotonic()
+      if wait > 0:
+        await asyncio.sleep(wait)
+      (func, args), self.pending = self.pending, None
+      self.last_start = time.monotonic()
+      self.executed += 1
+      try:
+        await func(*args)
+      except Exception as e:
+        print(f"{func.__name__} failed: {e}")
+    if DEBUG:
+      print(f"[DEBUG.coalescer] received {self.received}, executed {self.executed}")
+
+class AssetStore():
+  """
+  button images served under content hashed names
+
+  An image is copied to ASSET_DIR as <name>.<hash><ext> and served by the
+  /assets route with immutable cache headers, a changed file gets a new
+  name. SVGs up to `inline_limit` bytes are inlined as data URI. Images are
+  hashed once per file version (path, mtime, size), icon() is called once
+  per widget and config version, see PageTemplate.
+
+  Usage:
+    AssetStore.icon('/usr/share/icons/.../media-playback-stop.svg')
+      # 'img:data:image/svg+xml;base64,...' or 'img:/assets/media-playback-stop.1a2b3c4d5e6f7a8b.svg'
+  """
+  inline_limit = 4096         # max bytes of an inlined svg
+  icons = {}                  # (path, mtime, size): icon string
+
+  @classmethod
+  def icon(cls, image, name='') -> str:
+    "quasar icon string of an image file or '' if there is no such file"
+    if not image:
+      return ''
+    try:
+      st = os.stat(image)
+    except OSError:
+      return ''
+    key = (image, st.st_mtime_ns, st.st_size)
+    if key not in cls.icons:
+      cls.icons[key] = cls.add(image)
+      if DEBUG:
+        print(f'[DEBUG.{name}] icon: {cls.icons[key][:80]}')
+    return cls.icons[key]
+
+  @classmethod
+  def add(cls, image) -> str:
+    try:
+      with open(image, 'rb') as file:
+        data = file.read()
+    except OSError as e:
+      print(f"image '{image}' failed: {e}")
+      return ''
+    stem, ext = os.path.splitext(os.path.basename(image))
+    if ext.lower() == '.svg' and len(data) <= cls.inline_limit:
+      return f"img:data:image/svg+xml;base64,{base64.b64encode(data).decode('ascii')}"
+    name = f"{stem}.{hashlib.sha256(data).hexdigest()[:16]}{ext.lower()}"
+    path = os.path.join(ASSET_DIR, name)
+    if not os.path.exists(path):
+      os.makedirs(ASSET_DIR, exist_ok=True)
+      tmp = f"{path}.{os.getpid()}.tmp"
+      with open(tmp, 'wb') as file:
+        file.write(data)
+      os.replace(tmp, path)
+    return f"img:/assets/{name}"
 
 class Tile(QDiv):
   """
@@ -206,11 +659,14 @@ class Button(QBtn):
     **kwargs:
       - text: button id text
       - description: button text in normal state, if not set fallback to `text`
-      - description_alt: button text in active state [not in use yet]
+      - description_alt: button text in active state
       - wtype: 'button' (any string atm) for a button
       - command: command to execute on click
       - command_alt: if defined command to execute on click in active state
-        otherwise using `command`
+        otherwise using `command`, a signal name (e.g. SIGTERM) is sent to
+        the processes started by the button, see Supervisor
+      - timeout: seconds until the started process is terminated
+      - section: config section name, identifies the started processes
       - command_output: bool to grab command output or not
       - color_bg: background color
       - color_fg: foreground color
@@ -244,90 +700,133 @@ class Button(QBtn):
     # default **kwargs
     self.wtype = None             # button or empty
     self.description = ''         # button text
+    self.description_alt = ''     # button text in active state
+    self.icon = ''
+    self.icon_alt = ''
     self.image = ''               # used for files like svg and png
                                   # e.g. /usr/share/icons/breeze-dark/actions/24/media-playback-stop.svg
+    self.image_alt = ''
+    self.section = ''             # config section name, owner of the started processes
     self.command = ''             # command to run on click
-    self.command_output = False
+    self.command_alt = ''         # command or signal name (e.g. SIGTERM) on click in active state
+    self.timeout = ''             # seconds until the started process is terminated
+    self.command_output = False   # stream the command output into the OutputPanel
+    self.output = None            # RingBuffer of the last command output
     self.state = ''               # output of the state check command
+    self.state_pattern = ''
+    self.state_pattern_alt = ''
     self.state_command = ''       # command to check the unclicked state
+    self.state_task = None        # pending state re-check after a click
     self.color_bg = kwargs.pop('color_bg', '')
     self.color_fg = kwargs.pop('color_fg', '')
+    state = kwargs.pop('state', None)  # already known output of state_command
     super().__init__(**kwargs)
 
     self.text = self.description if self.description else self.text
     self.style = "width: 90px;"
     self.style += "min-height: 77px;"   # image + 2 text lines
-    self.style += "border: 1px solid var(--c-blue-grey-8);"  # #455a64 blue-grey-8
     self.style += "line-height: 1em;"
     if self.color_bg:
       self.style += f"background-color: {self.color_bg};"
     if self.color_fg:
       self.style += f"color: {self.color_fg} !important;"
+    self.classes += " border-c-blue-grey-8"  # #455a64 blue-grey-8, see update_state_style
 
-    if self.image and os.path.exists(self.image):
-      # copy image files into the static folder
-      basename = os.path.basename(self.image)
-        # e.g. media-playback-stop.svg
-      staticfile = os.path.join(STATIC_DIR, basename)
-        # e.g. <user-home>/.cache/controldeck/static/media-playback-stop.svg
-      if not os.path.exists(staticfile):
-        shutil.copy2(self.image, staticfile)
-        if DEBUG:
-          print(f'[DEBUG.btn.{self.text}] copy {self.image} to {staticfile}')
-      self.icon = f"img:/static/{basename}"
-        # e.g. img:/static/media-playback-stop.svg
-      # <q-icon name="img:data:image/svg+xml;charset=utf8,<svg xmlns='http://www.w3.org/2000/svg' height='140' width='500'><ellipse cx='200' cy='80' rx='100' ry='50' style='fill:yellow;stroke:purple;stroke-width:2' /></svg>" />
-      # <q-btn icon="img:data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAUAAAAFCAYAAACNbyblAAAAHElEQVQI12P4//8/w38GIAXDIBKE0DHxgljNBAAO9TXL0Y4OHwAAAABJRU5ErkJggg==" ... />
-      if DEBUG:
-        print(f'[DEBUG.btn.{self.text}] icon: {self.icon}')
+    icon = AssetStore.icon(self.image, f'btn.{self.text}')
+    self.icon = icon if icon else self.icon
+    icon_alt = AssetStore.icon(self.image_alt, f'btn.{self.text}')
+    self.icon_alt = icon_alt if icon_alt else self.icon_alt
+    # normal state, the alternative state swaps in the *_alt values if set
+    self.normal = {'text': self.text, 'icon': self.icon}
 
     if self.command != '':
-      self.update_state()
-      # setting style white-space:pre does not work, see wp.css below
-      self.tooltip = QTooltip(a=self, delay=500)
+      # setting style white-space:pre does not work, see PAGE_CSS
+      self.tooltip = QTooltip(a=self, delay=500, text='')  # no default text in justpy, see set_state
+      if state is None:
+        self.update_state()
+      else:
+        self.set_state(state)
       self.update_tooltip()
       self.on('click', self.click)
+    if self.command_output:
+      self.output = RingBuffer()
 
   async def click(self, msg):
     if self.command != '':
+      owner = self.section or self.text
+      command = self.command
+      if self.command_alt and self.is_state_alt():
+        if Supervisor.signal_number(self.command_alt) is not None:
+          # signal the processes started by this button
+          Supervisor.signal(owner, self.command_alt)
+          self.schedule_state_update()
+          return True
+        command = self.command_alt
       if DEBUG:
-        print(f"[DEBUG.btn.{self.text}] command: {self.command}")
-      # output=True freezes controldeck until process finished (until e.g. an emacs button is closed)
-      outputting = False
-      if DEBUG and self.command_output:
-        outputting = True
-
-      output = process(self.command, shell=True, output=outputting)
-
-      # def upd():
-      #   time.sleep(2)
-      #   print('foo')
-      #   self.text = ''
-      #   self.update_state()
-      #   self.update_tooltip()
-      #   self.update()
-      #   #self.wp.update()
-      #   #wp.update()
-      #   #await msg.page.update()
-      #   print('baz')
-      # process(self.command, shell=True, output=True, callback=upd)
-
-      if DEBUG:
-        print(f"[DEBUG.btn.{self.text}] output: {output}")
-      # TODO: command and state matching: command is running async
-      # and not 'finished' for state update. wait is also not
-      # 'possible' bc/ it could be long running process
-      time.sleep(1)
-      self.update_state()
-      self.update_tooltip()
+        print(f"[DEBUG.btn.{self.text}] command: {command}")
+      try:
+        timeout = float(self.timeout) if self.timeout else None
+      except ValueError:
+        timeout = None
+      # the output is read in the background, a long running command does
+      # not block (e.g. until an emacs button is closed)
+      proc = await Supervisor.spawn(command, owner, timeout, stream=self.command_output)
+      if proc is not None and self.command_output:
+        await msg.page.output_panel.open(msg.page, self)
+        asyncio.create_task(self.stream_output(proc, msg.page))
+      self.schedule_state_update(proc)
+      return True  # nothing changed yet, the state re-check pushes its own update
     else:
       return True
 
+  async def stream_output(self, proc, wp) -> None:
+    """read the output of proc in chunks into self.output and push it to the
+    OutputPanel of the page wp, at most every OutputPanel.interval seconds"""
+    self.output.clear()
+    panel = wp.output_panel
+    last = 0.0
+    while True:
+      chunk = await proc.stdout.read(4096)
+      if chunk:
+        self.output.write(chunk)
+      if not chunk or time.monotonic() - last > panel.interval:
+        last = time.monotonic()
+        await panel.refresh(wp, self)
+      if not chunk:
+        break
+    await proc.wait()
+    if DEBUG:
+      print(f"[DEBUG.btn.{self.text}] {self.output.total} bytes output, exit status {proc.returncode}")
+
+  def schedule_state_update(self, proc=None):
+    "re-check the state in the background, a newer click cancels the pending re-check"
+    if self.state_command == '':
+      return
+    if self.state_task is not None and not self.state_task.done():
+      self.state_task.cancel()
+    self.state_task = asyncio.create_task(self.state_update_after(proc))
+
+  async def state_update_after(self, proc=None):
+    # the command is ready when it has finished. a long running command (e.g.
+    # starting an application) gets STATE_DELAY seconds to come up
+    if proc is not None:
+      try:
+        await asyncio.wait_for(proc.wait(), STATE_DELAY)
+      except asyncio.TimeoutError:
+        pass
+    # a probe started before the command is done does not count, the new
+    # state is pushed to all pages showing a button with this state command
+    await StateStore.refresh([self.state_command], since=time.monotonic())
+
   def update_tooltip(self):
     if '\n' in self.command.strip():
       ttt = f"command:\n{textwrap.indent(self.command.strip(), '  ')}"
     else:
       ttt = f"command: {self.command.strip()}"
+    if '\n' in self.command_alt.strip():
+      ttt += f"\ncommand-alt:\n{textwrap.indent(self.command_alt.strip(), '  ')}"
+    elif self.command_alt:
+      ttt += f"\ncommand-alt: {self.command_alt.strip()}"
     if self.state_command:
       if '\n' in self.state:
         ttt += f"\nstate:\n{textwrap.indent(self.state, '  ')}"
@@ -341,23 +840,35 @@ class Button(QBtn):
 
   def update_state(self):
     if self.state_command != '':
-      self.state = process(self.state_command, shell=True)
-      if DEBUG:
-        print(f"[DEBUG.btn.{self.text}] updated btn state")
-        print(f"[DEBUG.btn.{self.text}] state_command: {self.state_command}")
-        print(f"[DEBUG.btn.{self.text}] state: {repr(self.state)} # state_pattern: {repr(self.state_pattern)} # state_pattern_alt: {repr(self.state_pattern_alt)}")
-        print(f"[DEBUG.btn.{self.text}] is_state_alt: {self.is_state_alt()}")
-      # TODO: update state instead of appending
-      if self.is_state_alt():
-        # self.style += "border: 1px solid green;"
-        # self.style += "border-bottom: 1px solid green;"
-        self.style += "border: 1px solid var(--c-light-blue-9);"
-        # self.style += "border-bottom: 1px solid var(--c-light-blue);"
-      else:
-        self.style += "border: 1px solid var(--c-blue-grey-8);"
+      self.set_state(process(self.state_command, shell=True))
     else:
       return True
 
+  def set_state(self, state) -> bool:
+    """apply the output of the state command to border, text, icon and
+    tooltip, returns True if anything visible changed"""
+    if self.state_command == '' or getattr(self, 'tooltip', None) is None:
+      return False  # buttons without a command do not show a state
+    before = (self.classes, self.text, self.icon, self.tooltip.text)
+    self.state = state if state is not None else ''
+    self.update_state_style()
+    self.update_tooltip()
+    return before != (self.classes, self.text, self.icon, self.tooltip.text)
+
+  def update_state_style(self):
+    if DEBUG:
+      print(f"[DEBUG.btn.{self.text}] updated btn state")
+      print(f"[DEBUG.btn.{self.text}] state_command: {self.state_command}")
+      print(f"[DEBUG.btn.{self.text}] state: {repr(self.state)} # state_pattern: {repr(self.state_pattern)} # state_pattern_alt: {repr(self.state_pattern_alt)}")
+      print(f"[DEBUG.btn.{self.text}] is_state_alt: {self.is_state_alt()}")
+    alt = self.is_state_alt()
+    # replace the border class, see PAGE_CSS: #0277bd light-blue-9 or #455a64 blue-grey-8
+    classes = [i for i in self.classes.split() if not i.startswith('border-c-')]
+    classes.append('border-c-light-blue-9' if alt else 'border-c-blue-grey-8')
+    self.classes = ' '.join(classes)
+    self.text = self.description_alt if alt and self.description_alt else self.normal['text']
+    self.icon = self.icon_alt if alt and self.icon_alt else self.normal['icon']
+
   # can be used to update all buttons on event
   # is like a full reload, and the page is blocked
   # def react(self, data):
@@ -368,10 +879,51 @@ class Button(QBtn):
   #     self.update_tooltip()
   #   # print(f"react done")
 
+class OutputPanel(QDialog):
+  """
+  dialog at the bottom of the page showing the streamed output of a Button
+  with command-output, see Button.stream_output
+  """
+  interval = 0.2              # min seconds between two pushes of the output
+
+  def __init__(self, **kwargs):
+    # temp=False: an id for component_update, the dialog and the output are
+    # pushed alone instead of the whole page
+    kwargs.setdefault('temp', False)
+    super().__init__(**kwargs)
+    self.position = 'bottom'
+    self.seamless = True
+    self.button = None          # Button whose output is shown
+    card = QCard(a=self, style='width:100vw;max-width:100vw;')
+    bar = QBar(a=card, classes='bg-'+COLOR_PRIME)
+    self.label = QItemLabel(a=bar)
+    QSpace(a=bar)
+    QBtn(a=bar, dense=True, flat=True, icon='close', v_close_popup=True)
+    section = QCardSection(a=card)
+    self.text_div = Div(
+      a=section, temp=False,
+      classes='text-blue-grey-4',
+      style='white-space:pre;font-family:monospace,monospace;max-height:40vh;overflow:auto;')
+
+  async def open(self, wp, button) -> None:
+    "show the output of button"
+    self.button = button
+    self.label.text = button.normal['text']
+    self.text_div.text = ''
+    self.value = True
+    await component_update(wp, self)
+
+  async def refresh(self, wp, button) -> None:
+    "push the current output of button if it is shown"
+    if self.button is button:
+      self.text_div.text = button.output.text()
+      await component_update(wp, self.text_div)
+
 class Slider(Div):
   def __init__(self, **kwargs):
     # instance vars
     self.slider = None        # for handle methods to access slider
+    self.coalescer = Coalescer()  # slider commands, newest value wins
     self.toggled = False
 
     # default **kwargs
@@ -387,6 +939,7 @@ class Slider(Div):
     self.max = float(self.max) if self.max else 100
     self.step = kwargs.pop('step', '1')
     self.step = float(self.step) if self.step else 1
+    state = kwargs.pop('state', None)  # already known output of state_command
     super().__init__(**kwargs)
     self.icon = self.icon if self.icon else 'tune'
     self.style = "width:286px;"  # three buttons and the two spaces
@@ -398,8 +951,10 @@ class Slider(Div):
     badge_name = self.description if self.description else self.name
     value = self.min
     if self.state_command:
+      if state is None:
+        state = process(self.state_command, shell=True)
       try:
-        value = float(process(self.state_command, shell=True))
+        value = float(state)
       except Exception as e:
         print(e)
 
@@ -441,10 +996,11 @@ class Slider(Div):
       if '{value}' in self.command:
         if DEBUG:
           print("[sld] command:", self.command.format(value=msg.value))
-        process(self.command.format(value=msg.value), shell=True, output=False)
+        self.coalescer.submit(command_run, self.command.format(value=msg.value))
       else:
         if DEBUG:
           print("[sld] command:", self.command)
+      return True  # the browser already shows the value, no page update
     self.slider = QSlider(
       value=value,
       min=self.min,
@@ -457,6 +1013,22 @@ class Slider(Div):
       style="opacity: 0.6 !important;" if self.is_toggled() else "opacity: unset !important;",
     )
 
+  def set_state(self, state) -> bool:
+    """apply the output of the state command to the slider value, returns
+    True if it changed. not while the slider commands of a drag are running"""
+    if not self.state_command or self.slider is None:
+      return False
+    if self.coalescer.task is not None and not self.coalescer.task.done():
+      return False
+    try:
+      value = float(state)
+    except (TypeError, ValueError):
+      return False
+    if value == self.slider.value:
+      return False
+    self.slider.value = value
+    return True
+
   # TODO: toggle?
   def is_toggled(self):
     # self.toggled = not self.toggled
@@ -464,14 +1036,14 @@ class Slider(Div):
 
 class Volume(Div):
   # class variables
-  data = {}                   # pulseaudio info for all sinks
   icon_muted = 'volume_mute'  # default icon for muted state, 'volume_off' better for disabled?
   icon_unmuted = 'volume_up'  # default icon for unmuted state
-  last_update = 0             # used for updates. init set to zero so the 1st diff is large to go into update at startup
 
   def __init__(self, **kwargs):
     # instance vars
     self.slider = None        # for handle methods to access slider
+    self.coalescer = Coalescer()  # slider commands, newest value wins
+    self.btn = None           # mute button
 
     # default **kwargs
     self.wtype = 'sink'       # sink (loudspeaker), source (microphone) or sink-input (app output)
@@ -480,20 +1052,13 @@ class Volume(Div):
 
     super().__init__(**kwargs)
     self.style = "width:286px;"  # three buttons and the two spaces
-    self.update_state()       # get self.pa_state
+    self.update_state()       # get self.pa_state, see PulseStore.ensure
 
     if self.pa_state:
-      if self.wtype == 'sink':
-        cmdl_toggle = 'pactl set-sink-mute {name} toggle'
-        cmdl_value = 'pactl set-sink-volume {name} {value}%'
-      elif self.wtype == 'source':
-        cmdl_toggle = 'pactl set-source-mute {name} toggle'
-        cmdl_value = 'pactl set-source-volume {name} {value}%'
+      if self.wtype == 'source':
         self.icon_muted = 'mic_none'  # default icon for muted state, 'mic_off' better for disabled?
         self.icon_unmuted = 'mic'     # default icon for unmuted state
       elif self.wtype == 'sink-input':
-        cmdl_toggle = 'pactl set-sink-input-mute {name} toggle'
-        cmdl_value = 'pactl set-sink-input-volume {name} {value}%'
         app_name = self.pa_state['properties']['application.process.binary'] if 'application.process.binary' in self.pa_state['properties'] else ''
         if app_name == '':
           app_name = self.pa_state['properties']['application.name'] if 'application.name' in self.pa_state['properties'] else ''
@@ -505,14 +1070,7 @@ class Volume(Div):
           self.pa_state['properties']['media.name']
       # local vars
       badge_name = self.description if self.description else self.name
-      volume_level = 0
-      if self.pa_state:  # might be empty {} if it is not found
-        # pulseaudio 2^16 (65536) volume levels
-        if 'front-left' in self.pa_state['volume']:
-          volume_level = float(self.pa_state['volume']['front-left']['value_percent'][:-1])  # remove the % sign
-        elif 'mono' in self.pa_state['volume']:
-          volume_level = float(self.pa_state['volume']['mono']['value_percent'][:-1])  # remove the % sign
-        # TODO: ? indicator if stream is stereo or mono ?
+      volume_level = self.volume_level()
 
       # 1st row; badge
       badge = QBadge(
@@ -540,9 +1098,10 @@ class Volume(Div):
         #avatar=True,  # more spacing than side
         a=item,
       )
-      def handle_btn(widget_self, msg):
-        # not checking the current state
-        process(cmdl_toggle.format(name=self.name), shell=True, output=False)
+      async def handle_btn(widget_self, msg):
+        # not checking the current state, switching the shown state
+        mute = widget_self.icon == self.icon_unmuted
+        await AudioBackend.get().set_mute(self.wtype, self.name, mute)
         if widget_self.icon == self.icon_unmuted:  # switch to mute
           widget_self.icon = self.icon_muted
           self.slider.style = "opacity: 0.6 !important;"
@@ -552,7 +1111,7 @@ class Volume(Div):
         # toggle disable state
         # this wont allow to change the volume in a mute state
         # self.slider.disable = not self.slider.disable
-      QBtn(
+      self.btn = QBtn(
         icon=self.icon_muted if self.is_muted() else self.icon_unmuted,
         dense=True,
         flat=True,
@@ -564,7 +1123,10 @@ class Volume(Div):
       # right slider
       item_section2 = QItemSection(a=item)
       def handle_slider(widget_self, msg):
-        process(cmdl_value.format(name=self.name,value=msg.value), shell=True, output=False)
+        self.coalescer.submit(
+          AudioBackend.get().set_volume, self.wtype, self.name, msg.value,
+          len(self.pa_state.get('volume', {})))
+        return True  # the browser already shows the value, no page update
       self.slider = QSlider(
         value=volume_level,
         min=0,
@@ -582,85 +1144,724 @@ class Volume(Div):
         style="opacity: 0.6 !important;" if self.is_muted() else "opacity: unset !important;",
       )
 
-  @classmethod
-  def update_states(cls) -> None:
-    """
-    get pulseaudio state of all sinks and sink-inputs and save it to
-    class variable data
-
-    creates and updates
-    Volume.data['sinks']
-    Volume.data['sink-inputs']
-    both might be empty lists but available
-    """
-    t = time.time()
-    dt = t - cls.last_update
-    if dt > 1.0: # update only if at least a second passed since last update
-      cls.last_update = t
-
-      # wsl not running pulse daemon: Connection failure: Connection refused
-      sinks = process('pactl -f json list sinks', shell=True)
-      if 'failure' in sinks:
-        print("'pactl -f json list sinks' returns: '", sinks, "'")
-        # fill (initialize) key 'sinks' and 'sink-inputs' to empty list so not enter KeyError
-        cls.data['sinks'] = []
-        cls.data['sources'] = []
-        cls.data['sink-inputs'] = []
-      else:
-        cls.data['sinks'] = json.loads(sinks)
-
-        # only do additionals if sink was working
-
-        sources = process('pactl -f json list sources', shell=True, stderr=None)
-        if 'failure' in sources:
-          print("'pactl -f json list sources' returns: '", sources, "'")
-          cls.data['sources'] = []
-        else:
-          cls.data['sources'] = json.loads(sources)
-
-        sink_inputs = process('pactl -f json list sink-inputs', shell=True, stderr=None)  # stderr might have e.g.: Invalid non-ASCII character: 0xffffffc3
-        if 'failure' in sink_inputs:
-          print("'pactl -f json list sink-inputs' returns: '", sink_inputs, "'")
-          cls.data['sink-inputs'] = []
-        else:
-          cls.data['sink-inputs'] = json.loads(sink_inputs)
-
   def update_state(self) -> None:
-    "fills self.pa_state, therefore access info via self.pa_state"
-    self.update_states()
-    tmp = []
-    # filter for the given pa name, empty list if not found
-    if self.wtype == 'sink':
-      # match pa name with self.name
-      tmp = list(filter(lambda item: item['name'] == self.name,
-                        Volume.data['sinks']))
-    elif self.wtype == 'source':
-      # match pa name with self.name
-      tmp = list(filter(lambda item: item['name'] == self.name,
-                        Volume.data['sources']))
-    elif self.wtype == 'sink-input':
+    "fills self.pa_state from PulseStore.snapshot, therefore access info via self.pa_state"
+    key = PulseStore.kinds.get(self.wtype)
+    name = self.name
+    if self.wtype == 'sink-input':
       # match pa index with self.name
       try:  # for int casting
-        tmp = list(filter(lambda item: item['index'] == int(self.name),
-                          Volume.data['sink-inputs']))
-      except:
+        name = int(self.name)
+      except ValueError:
         pass
-    self.pa_state = tmp[0] if tmp else {}
+    # sinks and sources match pa name with self.name, empty if not found
+    self.pa_state = PulseStore.snapshot.index[key].get(name, {}) if key else {}
 
   def is_muted(self):
     return self.pa_state['mute']
 
-class VolumeGroup():
+  def volume_level(self) -> float:
+    volume_level = 0
+    if self.pa_state:  # might be empty {} if it is not found
+      # pulseaudio 2^16 (65536) volume levels
+      if 'front-left' in self.pa_state['volume']:
+        volume_level = float(self.pa_state['volume']['front-left']['value_percent'][:-1])  # remove the % sign
+      elif 'mono' in self.pa_state['volume']:
+        volume_level = float(self.pa_state['volume']['mono']['value_percent'][:-1])  # remove the % sign
+      # TODO: ? indicator if stream is stereo or mono ?
+    return volume_level
+
+  def update_widget(self) -> list:
+    "apply self.pa_state to the slider and mute button, returns the changed components"
+    changed = []
+    if not self.pa_state or self.slider is None:
+      return changed  # not found while building, needs a page reload
+    value = self.volume_level()
+    style = "opacity: 0.6 !important;" if self.is_muted() else "opacity: unset !important;"
+    if self.slider.value != value or self.slider.style != style:
+      self.slider.value = value
+      self.slider.style = style
+      changed.append(self.slider)
+    icon = self.icon_muted if self.is_muted() else self.icon_unmuted
+    if self.btn.icon != icon:
+      self.btn.icon = icon
+      changed.append(self.btn)
+    return changed
+
+class VolumeGroup(Div):
+  """
+  Volume widgets of all sink-inputs, the group itself takes no space in the
+  layout (display: contents) so the Volume widgets line up with the others
+  """
   def __init__(self, **kwargs):
-    a = kwargs.pop('a', None)  # add Volume widgets to the specified component
-    Volume.update_states()
-    for i in Volume.data['sink-inputs']:
-      Volume(a=a, name=i['index'], wtype='sink-input')
+    super().__init__(**kwargs)
+    self.classes = "q-gutter-sm"
+    self.style = "display: contents;"
+    for i in PulseStore.snapshot.lists['sink-inputs']:
+      Volume(a=self, name=i['index'], wtype='sink-input')
+
+PulseSnapshot = namedtuple('PulseSnapshot', ['version', 'time', 'lists', 'index'])
+PulseSnapshot.__doc__ = """
+immutable pulseaudio state published by PulseStore
+  version        incremented with every refresh
+  time           time.time() of the refresh
+  lists[key]     tuple of the pactl json objects, key: sinks, sources, sink-inputs
+  index[key]     the same objects by name (sinks, sources) or by index (sink-inputs)
+"""
+
+class PulseStore():
+  """
+  pulseaudio sinks, sources and sink-inputs, the pactl lists are fetched in
+  parallel and published as a new PulseSnapshot. A snapshot is never
+  modified, readers keep a consistent state while a refresh is running.
+
+  Usage:
+    await PulseStore.ensure()        # refresh if older than max_age
+    await PulseStore.refresh(['sinks'])
+    PulseStore.snapshot.index['sinks'].get(name, {})
+  """
+  keys = ('sinks', 'sources', 'sink-inputs')
+  kinds = {'sink': 'sinks', 'source': 'sources', 'sink-input': 'sink-inputs'}  # wtype: key
+  snapshot = PulseSnapshot(
+    0, 0, MappingProxyType({i: () for i in keys}),
+    MappingProxyType({i: MappingProxyType({}) for i in keys}))
+
+  @staticmethod
+  async def fetch(key) -> tuple:
+    # wsl not running pulse daemon: Connection failure: Connection refused
+    # stderr might have e.g.: Invalid non-ASCII character: 0xffffffc3
+    res = None
+    try:
+      res = await process_async(f"pactl -f json list {key}", shell=True, stderr=subprocess.DEVNULL)
+      return tuple(json.loads(res))
+    except (TypeError, ValueError):
+      print(f"'pactl -f json list {key}' returns: '", res, "'")
+      return ()
+
+  @classmethod
+  async def refresh(cls, keys=None) -> PulseSnapshot:
+    "fetch the given (default all) lists and publish a new snapshot"
+    keys = [i for i in cls.keys if i in keys] if keys else list(cls.keys)
+    t = time.perf_counter()
+    results = await asyncio.gather(*[cls.fetch(i) for i in keys])
+    Metrics.volume_refresh.observe(time.perf_counter() - t)
+    lists = dict(cls.snapshot.lists)
+    lists.update(zip(keys, results))
+    index = {i: MappingProxyType({j['name' if i != 'sink-inputs' else 'index']: j for j in lists[i]})
+             for i in cls.keys}
+    cls.snapshot = PulseSnapshot(
+      cls.snapshot.version + 1, time.time(), MappingProxyType(lists), MappingProxyType(index))
+    return cls.snapshot
+
+  @classmethod
+  async def ensure(cls, max_age=1.0) -> PulseSnapshot:
+    "refresh unless PulseSubscriber keeps the snapshot up to date or it is recent"
+    if not PulseSubscriber.running and time.time() - cls.snapshot.time > max_age:
+      await cls.refresh()
+    return cls.snapshot
+
+class PulseSubscriber():
+  """
+  keeps PulseStore up to date with a long running `pactl subscribe` and
+  updates the Volume widgets of all open pages on sink, source and
+  sink-input events. Only the list of the affected object type is fetched
+  again.
+
+  Usage:
+    PulseSubscriber.start()  # inside the running event loop
+  """
+  running = False       # PulseStore.ensure is not polling while running
+  restart_delay = 5.0   # seconds before restarting a terminated pactl
+  debounce = 0.05       # seconds to collect events of one change
+  task = None
+
+  @classmethod
+  def start(cls) -> None:
+    if cls.task is None or cls.task.done():
+      cls.task = asyncio.create_task(cls.run())
+
+  @classmethod
+  async def run(cls) -> None:
+    pattern = re.compile(r"Event '(new|change|remove)' on (sink-input|sink|source) #([0-9]+)")
+    while True:
+      try:
+        proc = await asyncio.create_subprocess_exec(
+          'pactl', 'subscribe', stdout=subprocess.PIPE,
+          stderr=subprocess.DEVNULL, start_new_session=True)
+      except FileNotFoundError:
+        print("pactl not found, volume widgets are not updated")
+        return
+      await PulseStore.refresh()
+      cls.running = True
+      events = []
+      wake = asyncio.Event()
+      async def worker():
+        while True:
+          await wake.wait()
+          await asyncio.sleep(cls.debounce)  # collect the events of one change
+          wake.clear()
+          batch = events[:]
+          events.clear()
+          try:
+            await cls.handle(batch)
+          except Exception as e:
+            print(f"volume update failed: {e}")
+      worker_task = asyncio.create_task(worker())
+      try:
+        async for line in proc.stdout:
+          event = pattern.search(line.decode('utf-8', errors='replace'))
+          if event is not None:
+            events.append((event.group(1), event.group(2), int(event.group(3))))
+            wake.set()
+      finally:
+        cls.running = False
+        worker_task.cancel()
+        kill_process(proc)
+        await proc.wait()
+      print(f"'pactl subscribe' terminated, restart in {cls.restart_delay} s")
+      await asyncio.sleep(cls.restart_delay)
+
+  @classmethod
+  async def handle(cls, events) -> None:
+    "events: list of (event, kind, index), e.g. ('change', 'sink', 54)"
+    snapshot = await PulseStore.refresh({PulseStore.kinds[i[1]] for i in events})
+    changed = {'sink': set(), 'source': set(), 'sink-input': set()}  # by index
+    for event, kind, index in events:
+      changed[kind].add(index)
+    names = {kind: {i['name'] for i in snapshot.lists[PulseStore.kinds[kind]] if i['index'] in changed[kind]}
+             for kind in ('sink', 'source')}
+    inputs = set(snapshot.index['sink-inputs'])
+    for wp in main_pages():
+      components = []
+      relayout = False
+      for c in [i for j in wp.widgets.values() for i in j]:
+        if type(c) == VolumeGroup:
+          # add new and remove closed sink-inputs
+          present = {int(i.name): i for i in c.components if type(i) == Volume}
+          for index, volume in present.items():
+            if index not in inputs:
+              c.remove_component(volume)
+              volume.delete()
+              relayout = True
+          for index in sorted(inputs - set(present)):
+            Volume(a=c, name=index, wtype='sink-input')
+            relayout = True
+          volumes = [i for i in c.components if type(i) == Volume and int(i.name) in changed['sink-input']]
+        elif type(c) == Volume and c.wtype in names and c.name in names[c.wtype]:
+          volumes = [c]
+        else:
+          continue
+        for volume in volumes:
+          volume.update_state()
+          components += volume.update_widget()
+      if relayout:
+        await page_update(wp)
+      else:
+        for c in components:
+          await component_update(wp, c)
+
+class PactlBackend():
+  "volume and mute control with one pactl process per call, see AudioBackend"
+  name = 'pactl'
+  commands = {
+    'sink': ('pactl set-sink-volume {name} {value}%', 'pactl set-sink-mute {name} {mute}'),
+    'source': ('pactl set-source-volume {name} {value}%', 'pactl set-source-mute {name} {mute}'),
+    'sink-input': ('pactl set-sink-input-volume {name} {value}%', 'pactl set-sink-input-mute {name} {mute}'),
+  }
+
+  async def set_volume(self, wtype, name, value, channels=0) -> None:
+    "value in percent"
+    await command_run(self.commands[wtype][0].format(name=shlex.quote(str(name)), value=value))
+
+  async def set_mute(self, wtype, name, mute) -> None:
+    await command_run(self.commands[wtype][1].format(name=shlex.quote(str(name)), mute=int(bool(mute))))
+
+class PulseBackend():
+  """
+  volume and mute control inside the process through libpulse (ctypes), one
+  connection to the sound server is kept open by a pa_threaded_mainloop.
+  Calls do not wait for the server to acknowledge them.
+
+  Raises OSError if libpulse is missing or the server can not be reached.
+  """
+  name = 'pulse'
+  PA_VOLUME_NORM = 0x10000
+  PA_CHANNELS_MAX = 32
+  PA_CONTEXT_READY = 4
+  PA_CONTEXT_FAILED = 5
+  PA_CONTEXT_TERMINATED = 6
+
+  class CVolume(ctypes.Structure):
+    "pa_cvolume"
+    _fields_ = [('channels', ctypes.c_uint8),
+                ('values', ctypes.c_uint32 * 32)]  # PA_CHANNELS_MAX
+
+  def __init__(self, timeout=2.0):
+    path = ctypes.util.find_library('pulse')
+    if path is None:
+      raise OSError("libpulse not found")
+    lib = ctypes.CDLL(path)
+    p, u32, i = ctypes.c_void_p, ctypes.c_uint32, ctypes.c_int
+    cv = ctypes.POINTER(self.CVolume)
+    for func, restype, argtypes in (
+        ('pa_threaded_mainloop_new', p, []),
+        ('pa_threaded_mainloop_get_api', p, [p]),
+        ('pa_threaded_mainloop_start', i, [p]),
+        ('pa_threaded_mainloop_stop', None, [p]),
+        ('pa_threaded_mainloop_free', None, [p]),
+        ('pa_threaded_mainloop_lock', None, [p]),
+        ('pa_threaded_mainloop_unlock', None, [p]),
+        ('pa_context_new', p, [p, ctypes.c_char_p]),
+        ('pa_context_connect', i, [p, ctypes.c_char_p, i, p]),
+        ('pa_context_get_state', i, [p]),
+        ('pa_context_disconnect', None, [p]),
+        ('pa_context_unref', None, [p]),
+        ('pa_context_set_sink_volume_by_name', p, [p, ctypes.c_char_p, cv, p, p]),
+        ('pa_context_set_source_volume_by_name', p, [p, ctypes.c_char_p, cv, p, p]),
+        ('pa_context_set_sink_input_volume', p, [p, u32, cv, p, p]),
+        ('pa_context_set_sink_mute_by_name', p, [p, ctypes.c_char_p, i, p, p]),
+        ('pa_context_set_source_mute_by_name', p, [p, ctypes.c_char_p, i, p, p]),
+        ('pa_context_set_sink_input_mute', p, [p, u32, i, p, p]),
+        ('pa_operation_unref', None, [p])):
+      getattr(lib, func).restype = restype
+      getattr(lib, func).argtypes = argtypes
+    self.lib = lib
+    self.mainloop = lib.pa_threaded_mainloop_new()
+    self.context = lib.pa_context_new(lib.pa_threaded_mainloop_get_api(self.mainloop), APP_NAME.encode())
+    if lib.pa_threaded_mainloop_start(self.mainloop) < 0:
+      raise OSError("pa_threaded_mainloop_start failed")
+    lib.pa_threaded_mainloop_lock(self.mainloop)
+    res = lib.pa_context_connect(self.context, None, 0, None)
+    lib.pa_threaded_mainloop_unlock(self.mainloop)
+    if res < 0:
+      self.close()
+      raise OSError("pa_context_connect failed")
+    end = time.monotonic() + timeout
+    while not self.is_ready():
+      if self.state() in (self.PA_CONTEXT_FAILED, self.PA_CONTEXT_TERMINATED) or time.monotonic() > end:
+        self.close()
+        raise OSError("can not connect to the sound server")
+      time.sleep(0.01)
+
+  def state(self) -> int:
+    self.lib.pa_threaded_mainloop_lock(self.mainloop)
+    try:
+      return self.lib.pa_context_get_state(self.context)
+    finally:
+      self.lib.pa_threaded_mainloop_unlock(self.mainloop)
+
+  def is_ready(self) -> bool:
+    return self.state() == self.PA_CONTEXT_READY
+
+  def close(self) -> None:
+    self.lib.pa_threaded_mainloop_lock(self.mainloop)
+    self.lib.pa_context_disconnect(self.context)
+    self.lib.pa_context_unref(self.context)
+    self.lib.pa_threaded_mainloop_unlock(self.mainloop)
+    self.lib.pa_threaded_mainloop_stop(self.mainloop)
+    self.lib.pa_threaded_mainloop_free(self.mainloop)
+
+  def call(self, func, *args) -> None:
+    self.lib.pa_threaded_mainloop_lock(self.mainloop)
+    try:
+      if self.lib.pa_context_get_state(self.context) != self.PA_CONTEXT_READY:
+        raise OSError("sound server connection lost")
+      operation = func(self.context, *args, None, None)
+      if not operation:
+        raise OSError(f"{func.__name__} failed")
+      self.lib.pa_operation_unref(operation)
+    finally:
+      self.lib.pa_threaded_mainloop_unlock(self.mainloop)
+
+  async def set_volume(self, wtype, name, value, channels=0) -> None:
+    "value in percent, channels of the object (from PulseStore), default stereo"
+    volume = self.CVolume()
+    volume.channels = min(max(channels, 1) if channels else 2, self.PA_CHANNELS_MAX)
+    for i in range(volume.channels):
+      volume.values[i] = int(round(float(value) / 100 * self.PA_VOLUME_NORM))
+    if wtype == 'sink':
+      self.call(self.lib.pa_context_set_sink_volume_by_name, str(name).encode(), ctypes.byref(volume))
+    elif wtype == 'source':
+      self.call(self.lib.pa_context_set_source_volume_by_name, str(name).encode(), ctypes.byref(volume))
+    elif wtype == 'sink-input':
+      self.call(self.lib.pa_context_set_sink_input_volume, int(name), ctypes.byref(volume))
+
+  async def set_mute(self, wtype, name, mute) -> None:
+    if wtype == 'sink':
+      self.call(self.lib.pa_context_set_sink_mute_by_name, str(name).encode(), int(bool(mute)))
+    elif wtype == 'source':
+      self.call(self.lib.pa_context_set_source_mute_by_name, str(name).encode(), int(bool(mute)))
+    elif wtype == 'sink-input':
+      self.call(self.lib.pa_context_set_sink_input_mute, int(name), int(bool(mute)))
+
+class AudioBackend():
+  """
+  volume and mute control of sinks, sources and sink-inputs, selected with
+  [default] audio-backend:
+    auto   libpulse (PulseBackend) if available, otherwise pactl (default)
+    pulse  libpulse, pactl if it can not connect
+    pactl  one pactl process per call (PactlBackend)
+  A failing libpulse call is repeated with pactl and the connection is
+  re-established with the next call after `retry` seconds.
+
+  Usage:
+    await AudioBackend.get().set_volume('sink', name, 50, channels=2)
+    await AudioBackend.get().set_mute('sink-input', 12, True)
+  """
+  mode = 'auto'
+  retry = 10.0          # seconds between libpulse connection attempts
+  backend = None        # the libpulse backend once connected
+  fallback = PactlBackend()
+  last_try = -retry
+  task = None
+
+  @classmethod
+  def get(cls):
+    if cls.mode == 'pactl':
+      return cls.fallback
+    if cls.backend is None:
+      cls.connect()  # pactl until connected
+    return cls if cls.backend is not None else cls.fallback
+
+  @classmethod
+  def connect(cls) -> None:
+    "connect to the sound server in a thread, not blocking the event loop"
+    if (cls.task is not None and not cls.task.done()) or time.monotonic() - cls.last_try < cls.retry:
+      return
+    cls.last_try = time.monotonic()
+    async def run():
+      try:
+        cls.backend = await asyncio.to_thread(PulseBackend)
+        print("audio backend: libpulse")
+      except (OSError, AttributeError) as e:
+        print(f"audio backend: pactl ({e})")
+    cls.task = asyncio.create_task(run())
+
+  @classmethod
+  def failed(cls, e) -> None:
+    print(f"libpulse call failed, using pactl: {e}")
+    backend, cls.backend = cls.backend, None
+    try:
+      backend.close()
+    except (OSError, AttributeError):
+      pass
+
+  @classmethod
+  async def set_volume(cls, wtype, name, value, channels=0) -> None:
+    try:
+      await cls.backend.set_volume(wtype, name, value, channels)
+    except (OSError, AttributeError) as e:
+      cls.failed(e)
+      await cls.fallback.set_volume(wtype, name, value, channels)
+
+  @classmethod
+  async def set_mute(cls, wtype, name, mute) -> None:
+    try:
+      await cls.backend.set_mute(wtype, name, mute)
+    except (OSError, AttributeError) as e:
+      cls.failed(e)
+      await cls.fallback.set_mute(wtype, name, mute)
+
+class StateStore():
+  """
+  process wide store of the state command outputs, the one source of the
+  button states of all pages
+
+  A state command is probed once for all pages: a request while it is
+  running waits for the running probe, an output younger than its TTL is
+  reused as is and an older one is returned and refreshed in the
+  background. A changed output is pushed to every open page showing a
+  button with the state command, see buttons_update.
+
+  The TTL of a command is its state-interval (see state_interval), set
+  with the widget dict by ConfigCache, `max_age` for other commands. At
+  most `concurrency` probes run at the same time, background refreshes
+  included, see limit and [default] state-concurrency.
+
+  Usage:
+    states = await StateStore.get(['systemctl is-active sshd'])
+    await StateStore.refresh(['systemctl is-active sshd'])  # probe now
+  """
+  max_age = 1.0
+  intervals = {}      # state command: TTL in seconds, see StateEngine.commands
+  values = {}         # state command: output, '' if it failed
+  times = {}          # state command: time.monotonic() the probe of the output started
+  running = {}        # state command: (start time, task) of the running probe
+  probes = 0          # state commands run
+  hits = 0            # outputs reused within their TTL
+  concurrency = 8
+  semaphore = None    # shared by all probes, see limit
+
+  @classmethod
+  def limit(cls, concurrency) -> None:
+    "at most concurrency probes running at the same time"
+    concurrency = max(1, concurrency)
+    if cls.semaphore is None or concurrency != cls.concurrency:
+      cls.concurrency = concurrency
+      cls.semaphore = asyncio.Semaphore(concurrency)
+
+  @classmethod
+  async def probe(cls, command, start) -> str:
+    "run the state command, store and push its output if it changed"
+    if cls.semaphore is None:
+      cls.limit(cls.concurrency)
+    async with cls.semaphore:
+      output = await state_run(command)
+    output = output if output is not None else ''
+    cls.probes += 1
+    if start < cls.times.get(command, -1.0):
+      return output  # a newer probe finished first
+    changed = command in cls.values and cls.values[command] != output
+    cls.values[command] = output
+    cls.times[command] = start
+    if changed:
+      await buttons_update({command: output})
+    return output
+
+  @classmethod
+  def start(cls, command, since=None) -> asyncio.Task:
+    """task of the running probe of the command, a new one if none is
+    running or it started before since (time.monotonic())"""
+    start, task = cls.running.get(command, (None, None))
+    if task is None or task.done() or (since is not None and start < since):
+      start = time.monotonic()
+      task = asyncio.create_task(cls.probe(command, start))
+      cls.running[command] = (start, task)
+      def done(task):
+        if cls.running.get(command, (None, None))[1] is task:
+          del cls.running[command]
+      task.add_done_callback(done)
+    return task
+
+  @classmethod
+  async def refresh(cls, commands, since=None) -> dict:
+    """probe the commands now or wait for their running probe (if it started
+    after since), returns {command: output}"""
+    commands = list(commands)
+    # shield: a cancelled caller (e.g. a newer click) does not cancel the probe other pages wait for
+    results = await asyncio.gather(*[asyncio.shield(cls.start(i, since)) for i in commands])
+    return dict(zip(commands, results))
+
+  @classmethod
+  async def get(cls, commands) -> dict:
+    """outputs of the commands, unknown ones are probed first, ones older
+    than max_age are refreshed in the background"""
+    now = time.monotonic()
+    res = await cls.refresh([i for i in commands if i not in cls.values])
+    for command in commands:
+      if command in res:
+        continue
+      if now - cls.times[command] > cls.intervals.get(command, cls.max_age):
+        cls.start(command)
+      else:
+        cls.hits += 1
+      res[command] = cls.values[command]
+    return res
+
+  @classmethod
+  def prune(cls, commands) -> None:
+    "forget the outputs of state commands not in commands, e.g. removed from the config"
+    keep = set(commands)
+    for command in [i for i in cls.values if i not in keep]:
+      del cls.values[command]
+      del cls.times[command]
+
+class StateEngine():
+  """
+  gets the state command outputs of all widgets in a widget dict from
+  the StateStore
+
+  identical command strings are probed only once, for all pages, and at
+  most `concurrency` commands are running at the same time. Volume widgets
+  get their state from PulseStore, it is refreshed alongside if needed.
+
+  Usage:
+    states = await StateEngine.from_config(config).run(widget_dict)
+    states[state_command]  # output of the command, '' if it failed
+  """
+  def __init__(self, concurrency=8):
+    self.concurrency = max(1, concurrency)
+
+  @classmethod
+  def from_config(cls, config):
+    "state engine with the configured state-concurrency"
+    try:
+      concurrency = config.getint('default', 'state-concurrency', fallback=8)
+    except ValueError as e:
+      concurrency = 8
+      print(f"Error state-concurrency: {e}. fallback to: {concurrency}")
+    return cls(concurrency=concurrency)
+
+  @staticmethod
+  def commands(widget_dict) -> dict:
+    """unique state commands of the widgets in config order with their
+    state-interval, the shortest one of a command used by several widgets"""
+    commands = {}
+    for tab_name in widget_dict:
+      for sec_id in widget_dict[tab_name]:
+        for j in widget_dict[tab_name][sec_id]:
+          if not j.get('state-command'):
+            continue
+          if j['type'] == 'button' and not j['command']:
+            continue  # buttons without a command do not show a state
+          interval = j.get('state-interval', StateStore.max_age)
+          commands[j['state-command']] = min(interval, commands.get(j['state-command'], interval))
+    return commands
+
+  async def run(self, widget_dict) -> dict:
+    StateStore.limit(self.concurrency)
+    commands = list(self.commands(widget_dict))
+    volumes = any(j['type'] in ('sink', 'source', 'sink-inputs')
+                  for tab_name in widget_dict
+                  for sec_id in widget_dict[tab_name]
+                  for j in widget_dict[tab_name][sec_id])
+    t = time.perf_counter()
+    states, _ = await asyncio.gather(
+      StateStore.get(commands),
+      PulseStore.ensure() if volumes else asyncio.sleep(0))
+    Metrics.state_check.observe(time.perf_counter() - t)
+    if DEBUG:
+      print(f"[DEBUG.state] {len(commands)} state commands, concurrency {self.concurrency}, "
+            f"{StateStore.probes} probes in total")
+    return states
+
+class StateScheduler():
+  """
+  polls the state commands of the connected pages in the background, each
+  every state-interval seconds (see StateStore), enabled with [default]
+  state-poll
+
+  The commands are kept in a heap by their next due time, the interval is
+  jittered by +- `jitter` (a fraction) so commands with the same interval
+  spread out. At most `concurrency` probes are running at the same time,
+  a command still being probed when it is due again skips that cycle.
+  Changed states are pushed by the StateStore, unchanged ones send
+  nothing. Without a connected page the scheduler sleeps until woken by
+  a page, see wake.
+
+  Usage:
+    StateScheduler.start(concurrency=8)  # inside the running event loop
+    StateScheduler.wake()                # a page connected or built a tab
+  """
+  jitter = 0.1
+  min_interval = 0.5    # seconds, also for a state-interval of 0
+  concurrency = 8
+  heap = []             # (due time, command)
+  due = {}              # command: its due time in the heap, older heap entries are stale
+  inflight = set()      # commands being probed, including the ones waiting for a slot
+  event = None          # set by wake
+  semaphore = None
+  task = None
+  probes = 0
+  skipped = 0           # due commands skipped, their previous probe still running
+
+  @classmethod
+  def start(cls, concurrency=8) -> None:
+    cls.concurrency = max(1, concurrency)
+    cls.semaphore = asyncio.Semaphore(cls.concurrency)
+    cls.event = asyncio.Event()
+    if cls.task is None or cls.task.done():
+      cls.task = asyncio.create_task(cls.run())
+
+  @classmethod
+  def wake(cls) -> None:
+    "check the connected pages for new commands now, ends the pause"
+    if cls.event is not None:
+      cls.event.set()
+
+  @staticmethod
+  def commands() -> dict:
+    "state commands of the built tabs of the connected pages with their state-interval"
+    res = {}
+    for wp in main_pages():
+      if not WebPage.sockets.get(wp.page_id):
+        continue
+      built = {i: j for i, j in wp.widget_dict.items() if i in wp.built}
+      for command, interval in StateEngine.commands(built).items():
+        res[command] = min(interval, res.get(command, interval))
+    return res
+
+  @classmethod
+  def schedule(cls, command, interval, now) -> None:
+    interval = max(cls.min_interval, interval)
+    due = now + interval * (1 + random.uniform(-cls.jitter, cls.jitter))
+    cls.due[command] = due
+    heapq.heappush(cls.heap, (due, command))
+
+  @classmethod
+  async def probe(cls, command) -> None:
+    try:
+      async with cls.semaphore:
+        cls.probes += 1
+        await StateStore.refresh([command])
+    except Exception as e:
+      print(f"state poll '{command}' failed: {e}")
+    finally:
+      cls.inflight.discard(command)
+
+  @classmethod
+  async def run(cls) -> None:
+    while True:
+      commands = cls.commands()
+      if not commands:
+        # pause, nothing is polled until a page connects
+        cls.heap, cls.due = [], {}
+        if DEBUG:
+          print("[DEBUG.scheduler] no connected pages, paused")
+        cls.event.clear()
+        await cls.event.wait()
+        continue
+      now = time.monotonic()
+      for command in [i for i in cls.due if i not in commands]:
+        del cls.due[command]  # no longer shown, its heap entry is stale
+      for command, interval in commands.items():
+        if command not in cls.due:
+          # newly shown, just probed for the page build
+          cls.schedule(command, interval, now)
+      while cls.heap and cls.heap[0][0] <= now:
+        due, command = heapq.heappop(cls.heap)
+        if cls.due.get(command) != due:
+          continue
+        if command in cls.inflight:
+          cls.skipped += 1
+        else:
+          cls.inflight.add(command)
+          asyncio.create_task(cls.probe(command))
+        cls.schedule(command, commands[command], now)
+      while cls.heap and cls.due.get(cls.heap[0][1]) != cls.heap[0][0]:
+        heapq.heappop(cls.heap)  # drop stale entries, the next one is the real next due
+      cls.event.clear()
+      try:
+        await asyncio.wait_for(cls.event.wait(), cls.heap[0][0] - now if cls.heap else None)
+      except asyncio.TimeoutError:
+        pass
+
+async def buttons_update(states) -> int:
+  """apply state command outputs {state_command: output} to the Buttons and
+  Sliders of all open pages and push only the changed ones, returns the
+  bytes sent"""
+  sent = 0
+  for wp in main_pages():
+    for c in [i for j in wp.widgets.values() for i in j]:
+      if type(c) == Button and c.command != '' and c.state_command in states:
+        if c.set_state(states[c.state_command]):
+          sent += await component_update(wp, c)
+      elif type(c) == Slider and c.state_command in states:
+        if c.set_state(states[c.state_command]):
+          sent += await component_update(wp, c.slider)
+  if DEBUG:
+    print(f"[DEBUG.btn] {len(states)} states, {sent} bytes sent")
+  return sent
 
 async def update(self, msg):
-  for i,j in Button.instances.items():
-    if type(j) == Button:
-      j.update_state()
+  "update the button states of the page (and all pages showing the same buttons)"
+  config, _ = ConfigCache.load()
+  wp = msg.page
+  built = {i: j for i, j in wp.widget_dict.items() if i in wp.built}
+  # outputs within their state-interval are reused, older ones are
+  # refreshed and the StateStore pushes the changed states to all pages
+  await StateEngine.from_config(config).run(built)
+  return True  # changed buttons are already pushed
 
 async def reload(self, msg):
   await msg.page.reload()
@@ -674,13 +1875,27 @@ async def reload_all_instances(self, msg):
 async def kill_gui(self, msg):
   if 'pid' in msg.page.request.query_params:
     pid = msg.page.request.query_params.get('pid')
-    await process(f"kill {pid}")
+    await process_async(f"kill {pid}", output=False)
   else:
-    await process("pkill controldeck-gui")
+    await process_async("pkill controldeck-gui", output=False)
 
 def ishexcolor(code):
   return bool(re.search(r'^#(?:[0-9a-fA-F]{3}){1,2}$', code))
 
+def state_interval(config, section, tab_name) -> float:
+  """seconds a state command output of the widget section is reused (see
+  StateStore): state-interval of the section, of its tab ([tab.NAME]) or
+  of [default], StateStore.max_age if not set"""
+  for i in (section, f"tab.{tab_name}", 'default'):
+    value = config.get(i, 'state-interval', fallback='')
+    if not value:
+      continue
+    try:
+      return max(0.0, float(value))
+    except ValueError as e:
+      print(f"Error state-interval [{i}]: {e}. fallback to the next level")
+  return StateStore.max_age
+
 def widget_load(config) -> dict:
   """scan for widgets to add (adding below) in the config
   {
@@ -729,9 +1944,11 @@ def widget_load(config) -> dict:
                  'command': config.get(i, 'command', fallback=''),
                  'command-alt': config.get(i, 'command-alt', fallback=''),
                  'command-output': config.get(i, 'command-output', fallback='False').title() == 'True',
+                 'timeout': config.get(i, 'timeout', fallback=''),
                  'state': config.get(i, 'state', fallback=''),
                  'state-alt': config.get(i, 'state-alt', fallback=''),
                  'state-command': config.get(i, 'state-command', fallback=''),
+                 'state-interval': state_interval(config, i, tab_name),
                  'icon': config.get(i, 'icon', fallback=''),
                  'icon-alt': config.get(i, 'icon-alt', fallback=''),
                  'image': config.get(i, 'image', fallback=''),
@@ -745,6 +1962,7 @@ def widget_load(config) -> dict:
                  'icon': config.get(i, 'icon', fallback=''),
                  'command': config.get(i, 'command', fallback=''),
                  'state-command': config.get(i, 'state-command', fallback=''),
+                 'state-interval': state_interval(config, i, tab_name),
                  'min': config.get(i, 'min', fallback=''),
                  'max': config.get(i, 'max', fallback=''),
                  'step': config.get(i, 'step', fallback=''),
@@ -768,6 +1986,7 @@ def widget_load(config) -> dict:
         args = [{'widget-class': VolumeGroup,
                  'type': wid_type,
                  }]
+      args[0]['section'] = i  # config section name, unique id of the widget
       if tab_name not in widget_dict:
         widget_dict.update({tab_name: {}})
       # try:
@@ -780,42 +1999,433 @@ def widget_load(config) -> dict:
         widget_dict[tab_name][sec_id] = args
   return widget_dict
 
-@SetRoute('/')
-async def application(request):
+class ConfigCache():
   """
-  Components:
-  [QLayout]
-  +-[QHeader]
-    +-[QBar]
-      +-[QBtnToggle] - tabs
-      +-[QSpace]
-      +-[QBtn] - edit
-      +-[ToggleDarkModeBtn]
-      +-[QBtn] - fullscreen
-      +-[QBtn] - reload
-      +-([QBtn]) - close
-  +-[QPageContainer]
-    +-[QPage]
-      +-[QTabPanel]
-      +-[QTabPanel]
-      +-[QTabPanel]
-      +-[QTabPanel]
-      +-...
+  process wide cache of the parsed config and its widget dict
+
+  The cache key is the config path together with the mtime, size and inode
+  of the file, a changed or replaced file is parsed again on the next load.
+  The returned config and widget dict are shared, do not modify them.
+
+  Usage:
+    config, widget_dict = ConfigCache.load()
   """
-  wp = QuasarPage(
-    title=APP_NAME,
-    dark=True,
-    classes="blue-grey-10",
-  )
+  conf = ''             # custom config path (cli), '' for the default locations
+  key = None            # (path, mtime, size, inode) of the cached config
+  config = None
+  widget_dict = None
+  version = 0           # config version, incremented on every (re)load
+  hits = 0              # loads served from the cache
+  reloads = 0           # loads parsing the file
 
-  # can be accessed via msg.page.request
-  wp.request = request
-  tab_choice = request.query_params.get('tab', '[all]')  # if tab is not specified default to [all]
+  @classmethod
+  def load(cls):
+    path = config_path(cls.conf)
+    try:
+      st = os.stat(path)
+      key = (path, st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+      key = (path, None, None, None)  # not (yet) existing
+    if key == cls.key:
+      cls.hits += 1
+    else:
+      cls.config = config_load(path)
+      cls.widget_dict = widget_load(cls.config)
+      StateStore.intervals = StateEngine.commands(cls.widget_dict)
+      cls.key = key
+      cls.version += 1
+      cls.reloads += 1
+    if DEBUG:
+      print(f"[DEBUG.config] {cls.stats()}")
+    return cls.config, cls.widget_dict
 
-  wp.page_type = 'main'
-  wp.head_html = """<meta name="viewport" content="width=device-width, initial-scale=1">
+  @classmethod
+  def stats(cls) -> dict:
+    return {'path': cls.key[0] if cls.key else '', 'version': cls.version,
+            'hits': cls.hits, 'reloads': cls.reloads}
+
+def tab_options(tab_names) -> list:
+  "options of the tab QBtnToggle"
+  options = []
+  for tab in tab_names:
+    label = tab.capitalize()
+    if tab == '[all]':
+      options.append({
+        'label': '',
+        'value': tab,
+        #'icon': 'fiber_smart_record',
+        #'icon': 'device_hub',
+        'icon': 'brightness_auto',
+        #'icon': 'looks',
+      })
+    elif tab == '':
+      options.append({
+        'label': '',
+        'value': tab,
+        'icon': 'radio_button_unchecked',
+      })
+    else:
+      options.append({
+        'label': label,
+        'value': tab,
+      })
+  return options
+
+def widget_kwargs(j) -> dict:
+  """constructor kwargs of the widget defined by the widget args j (see
+  widget_load), without the per page ones (state, a)"""
+  # TODO: empty using label class, like an alias?
+  if j['widget-class'] == Empty:
+    return dict(wtype=j['type'])
+  if j['widget-class'] == Label:
+    return dict(text=j['text'], wtype=j['type'])
+  if j['widget-class'] == Button:
+    # images are resolved (see AssetStore) once per config version
+    return dict(
+      text=j['text'],
+      wtype=j['type'],
+      description=j['description'],
+      description_alt=j['description-alt'],
+      command=j['command'], command_alt=j['command-alt'],
+      command_output=j['command-output'], timeout=j['timeout'],
+      section=j['section'],
+      color_bg=j['color-bg'], color_fg=j['color-fg'],
+      state_pattern=j['state'], state_pattern_alt=j['state-alt'],
+      state_command=j['state-command'],
+      icon=AssetStore.icon(j['image'], f"btn.{j['text']}") or j['icon'],
+      icon_alt=AssetStore.icon(j['image-alt'], f"btn.{j['text']}") or j['icon-alt'])
+  if j['widget-class'] == Slider:
+    return dict(
+      name=j['name'], description=j['description'],
+      wtype=j['type'],
+      icon=j['icon'],
+      command=j['command'], state_command=j['state-command'],
+      min=j['min'], max=j['max'], step=j['step'])
+  if j['widget-class'] == Volume:
+    return dict(name=j['name'], description=j['description'], wtype=j['type'])
+  if j['widget-class'] == VolumeGroup:
+    return dict(wtype=j['type'])
+  return {}
+
+class PageTemplate():
+  """
+  process wide template of the main page per config version
+
+  Components are bound to one page (id, event handlers), they can not be
+  shared. Everything else is resolved once per config version: the tab
+  names and options and the constructor kwargs of every widget. A page is
+  stamped out of the template and the per page state (state command
+  outputs, tab choice) is overlaid, see widget_make.
+
+  Usage:
+    template = PageTemplate.load(widget_dict)
+    template.tab_options
+  """
+  widget_dict = None    # widget dict the template was built from
+  version = 0           # ConfigCache.version of the template
+  tab_names = []
+  tab_options = []
+  widgets = {}          # config section name: (widget args, constructor kwargs)
+  hits = 0              # pages built from the cached template
+  builds = 0
+
+  @classmethod
+  def load(cls, widget_dict):
+    if widget_dict is cls.widget_dict:
+      cls.hits += 1
+      return cls
+    cls.tab_names = ['[all]'] + list(widget_dict.keys())  # an all tab + all defined tab in the config
+    cls.tab_options = tab_options(cls.tab_names)
+    cls.widgets = {j['section']: (j, widget_kwargs(j))
+                   for tab_name in widget_dict
+                   for sec_id in widget_dict[tab_name]
+                   for j in widget_dict[tab_name][sec_id]}
+    cls.widget_dict = widget_dict
+    cls.version = ConfigCache.version
+    cls.builds += 1
+    return cls
+
+  @classmethod
+  def kwargs(cls, j) -> dict:
+    "cached constructor kwargs of the widget args j"
+    cached = cls.widgets.get(j['section'])
+    if cached is None or cached[0] is not j:  # e.g. a widget dict not loaded
+      return widget_kwargs(j)
+    return cached[1]
+
+def widget_make(j, a, states) -> None:
+  """create the widget defined by the widget args j (see widget_load) inside
+  the component a, states are the state command outputs (see StateEngine)"""
+  kwargs = PageTemplate.kwargs(j)
+  if j['widget-class'] in (Button, Slider):
+    kwargs = dict(kwargs, state=states.get(j['state-command']))
+  j['widget-class'](**kwargs, a=a)
+
+def widget_add(wp, tab_name, sec_id, j, states) -> list:
+  """create the widget j at the end of its section Div of the page wp, the Div
+  is created if needed. returns the created components"""
+  if (tab_name, sec_id) not in wp.sections:
+    wp.sections[(tab_name, sec_id)] = Div(
+      name="_div_"+tab_name+sec_id,  # tab_name: chars or sting-letters, sec_id '' or a string-number
+      classes="row q-pa-sm q-gutter-sm",
+      a=wp.tab_panel[tab_name])
+  div = wp.sections[(tab_name, sec_id)]
+  n = len(div.components)
+  t = time.perf_counter()
+  widget_make(j, div, states)
+  if Profiler.widget_times is not None:  # page build profiling, see Profiler.page
+    count, total = Profiler.widget_times.get(j['type'], (0, 0.0))
+    Profiler.widget_times[j['type']] = (count + 1, total + time.perf_counter() - t)
+  wp.widgets[j['section']] = div.components[n:]  # VolumeGroup adds several
+  return wp.widgets[j['section']]
+
+def tab_panels_show(wp, tab_choice) -> None:
+  "show the tab panel tab_choice of the page wp (all for '[all]'), hide the others"
+  tab_panel = wp.tab_panel
+  if tab_choice == '[all]':
+    for tab_name in tab_panel.keys():
+      if tab_panel[tab_name].has_class('hidden'):
+        tab_panel[tab_name].remove_class('hidden')
+  else:
+    for tab_name in tab_panel.keys():
+      if not tab_panel[tab_name].has_class('hidden'):
+        tab_panel[tab_name].set_class('hidden')
+    if tab_choice in tab_panel:
+      tab_panel[tab_choice].remove_class('hidden')
+
+async def tab_build(wp, tab_names) -> bool:
+  """build the widgets of the not yet built tabs of the page wp, their state
+  commands run first. returns True if anything was built"""
+  todo = [i for i in tab_names if i in wp.widget_dict and i not in wp.built]
+  if not todo:
+    return False
+  config, _ = ConfigCache.load()
+  states = await StateEngine.from_config(config).run({i: wp.widget_dict[i] for i in todo})
+  built = False
+  for tab_name in todo:
+    # the page might have changed while the state commands were running
+    if tab_name not in wp.widget_dict or tab_name in wp.built:
+      continue
+    for sec_id in wp.widget_dict[tab_name]:
+      for j in wp.widget_dict[tab_name][sec_id]:
+        widget_add(wp, tab_name, sec_id, j, states)
+    wp.built.add(tab_name)
+    built = True
+  StateScheduler.wake()  # poll the new state commands too
+  if DEBUG:
+    print(f"[DEBUG.tab] page {wp.page_id}: built {todo}, {len(states)} state commands")
+  return built
+
+async def page_ready(self, msg):
+  """page_ready event handler: the page is connected, wake the
+  StateScheduler, in the [all] view build the remaining tabs"""
+  StateScheduler.wake()
+  await tabs_build_all(self, msg)
+  return True  # every built tab is already pushed
+
+async def tabs_build_all(self, msg):
+  """build the remaining tabs of the page one after another and push each,
+  stops when the page leaves the [all] view. returns True if anything was
+  pushed, None to let justpy push the page (e.g. changed tab visibility)"""
+  wp = msg.page if msg.page else self
+  pushed = None
+  for tab_name in list(wp.widget_dict):
+    if wp.tab_btns.value != '[all]':
+      break
+    if await tab_build(wp, [tab_name]):
+      await page_update(wp)
+      pushed = True
+  return pushed
+
+def widget_diff(old, new) -> dict:
+  """widget level difference between two widget dicts (see widget_load),
+  widgets are identified by their config section name
+  {
+    'added': [widget-args],
+    'removed': [widget-args],
+    'changed': [widget-args],  # the new args
+    'sections': [(tab-name, section-id)],  # sections with any difference
+    'tabs': bool,  # tab names or their order changed
+  }
+  """
+  def flat(widget_dict):
+    return {j['section']: j
+            for tab_name in widget_dict
+            for sec_id in widget_dict[tab_name]
+            for j in widget_dict[tab_name][sec_id]}
+  old_flat = flat(old)
+  new_flat = flat(new)
+  diff = {
+    'added': [j for i, j in new_flat.items() if i not in old_flat],
+    'removed': [j for i, j in old_flat.items() if i not in new_flat],
+    'changed': [j for i, j in new_flat.items()
+                if i in old_flat and j != old_flat[i]],
+    'sections': [],
+    'tabs': list(old) != list(new),
+  }
+  for tab_name in list(new) + [i for i in old if i not in new]:
+    old_secs = old.get(tab_name, {})
+    new_secs = new.get(tab_name, {})
+    for sec_id in list(new_secs) + [i for i in old_secs if i not in new_secs]:
+      if old_secs.get(sec_id) != new_secs.get(sec_id):
+        diff['sections'].append((tab_name, sec_id))
+  return diff
+
+def page_patch(wp, new, diff, states) -> None:
+  """patch the widget dict difference (see widget_diff) into the page wp,
+  unchanged widgets are kept as they are. push it with page_update(wp)"""
+  old = wp.widget_dict
+  template = PageTemplate.load(new)
+  tab_names = template.tab_names
+  tab_choice = wp.tab_btns.value
+  for tab_name in tab_names:
+    if tab_name not in wp.tab_panel:
+      wp.tab_panel[tab_name] = QTabPanel(name=tab_name, classes="q-pa-none", a=wp.tab_page)
+      if tab_choice != '[all]' and tab_choice != tab_name:
+        wp.tab_panel[tab_name].set_class('hidden')
+      else:
+        wp.built.add(tab_name)  # shown, build it right away
+  drop = {j['section'] for j in diff['removed'] + diff['changed']}
+  for tab_name, sec_id in diff['sections']:
+    if tab_name not in wp.built:
+      continue  # built from the new widget dict on first show
+    # remove the widgets which are gone or changed
+    for j in old.get(tab_name, {}).get(sec_id, []):
+      if j['section'] in drop:
+        for c in wp.widgets.pop(j['section'], []):
+          wp.sections[(tab_name, sec_id)].remove_component(c)
+          c.delete()
+    # add the new and changed widgets, then restore the config order
+    order = []
+    for j in new.get(tab_name, {}).get(sec_id, []):
+      if j['section'] not in wp.widgets:
+        widget_add(wp, tab_name, sec_id, j, states)
+      order += wp.widgets[j['section']]
+    if (tab_name, sec_id) not in wp.sections:
+      continue
+    if order:
+      wp.sections[(tab_name, sec_id)].components = order
+    else:
+      wp.tab_panel[tab_name].remove_component(wp.sections.pop((tab_name, sec_id)))
+  for tab_name in list(wp.tab_panel):
+    if tab_name not in tab_names:
+      wp.tab_page.remove_component(wp.tab_panel.pop(tab_name))
+  wp.tab_page.components = [wp.tab_panel[i] for i in tab_names]
+  for tab_name in new:  # restore the section order
+    wp.tab_panel[tab_name].components = [
+      wp.sections[(tab_name, i)] for i in new[tab_name]
+      if (tab_name, i) in wp.sections]
+  if diff['tabs']:
+    wp.tab_btns.options = template.tab_options
+  wp.built.intersection_update(new)
+  wp.widget_dict = new
+
+async def config_reload() -> None:
+  """load the config (if changed) and patch the widget changes into all open
+  pages, only added and changed widgets run their state commands"""
+  config, widget_dict = ConfigCache.load()
+  ShellPool.from_config(config)
+  pages = [i for i in main_pages() if i.widget_dict is not widget_dict]
+  if not pages:
+    return
+  diffs = {}  # pages built from the same config share the diff
+  for wp in pages:
+    if id(wp.widget_dict) not in diffs:
+      diffs[id(wp.widget_dict)] = widget_diff(wp.widget_dict, widget_dict)
+  renew = {}
+  for diff in diffs.values():
+    for j in diff['added'] + diff['changed']:
+      renew.setdefault('', {}).setdefault('', []).append(j)
+  states = await StateEngine.from_config(config).run(renew)
+  StateStore.prune(StateEngine.commands(widget_dict))
+  for wp in pages:
+    diff = diffs[id(wp.widget_dict)]
+    page_patch(wp, widget_dict, diff, states)
+    if DEBUG:
+      print(f"[DEBUG.config] page {wp.page_id}: {len(diff['added'])} added, "
+            f"{len(diff['removed'])} removed, {len(diff['changed'])} changed widgets")
+    await page_update(wp)
+
+class ConfigWatcher():
+  """
+  watches the config file and patches changes into the open pages, see
+  config_reload
+
+  Uses inotify on the config directory (editors often replace the file
+  instead of writing into it) and falls back to polling the file every
+  `interval` seconds where inotify is not available.
+
+  Usage:
+    ConfigWatcher.start()  # inside the running event loop
+  """
+  interval = 2.0        # polling interval in seconds (fallback)
+  debounce = 0.2        # seconds to collect further events of one save
+  task = None
+
+  # inotify(7)
+  IN_MODIFY = 0x00000002
+  IN_CLOSE_WRITE = 0x00000008
+  IN_MOVED_TO = 0x00000080
+  IN_CREATE = 0x00000100
+  IN_DELETE = 0x00000200
+
+  @classmethod
+  def start(cls) -> None:
+    if cls.task is None or cls.task.done():
+      cls.task = asyncio.create_task(cls.run())
+
+  @classmethod
+  def inotify(cls, directory):
+    "returns an inotify file descriptor watching directory or None"
+    try:
+      libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+      fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+      if fd < 0:
+        return None
+      mask = cls.IN_MODIFY | cls.IN_CLOSE_WRITE | cls.IN_MOVED_TO | cls.IN_CREATE | cls.IN_DELETE
+      if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+      return fd
+    except (OSError, AttributeError) as e:
+      print(f"inotify not available: {e}")
+      return None
+
+  @classmethod
+  async def run(cls) -> None:
+    loop = asyncio.get_running_loop()
+    changed = asyncio.Event()
+    fd = cls.inotify(os.path.dirname(config_path(ConfigCache.conf)))
+    if fd is not None:
+      def readable():
+        try:
+          while os.read(fd, 4096):  # drain, the config key decides about changes
+            pass
+        except BlockingIOError:
+          pass
+        changed.set()
+      loop.add_reader(fd, readable)
+    try:
+      while True:
+        if fd is not None:
+          await changed.wait()
+          await asyncio.sleep(cls.debounce)
+          changed.clear()
+        else:
+          await asyncio.sleep(cls.interval)
+        try:
+          await config_reload()
+        except Exception as e:
+          print(f"config reload failed: {e}")
+    finally:
+      if fd is not None:
+        loop.remove_reader(fd)
+        os.close(fd)
+
+# head and css of the main page, shared by all pages
+PAGE_HEAD_HTML = """<meta name="viewport" content="width=device-width, initial-scale=1">
     <meta name="mobile-web-app-capable" content="yes">"""
-  wp.css = """
+PAGE_CSS = """
     .q-icon {
       height: unset;  /* overwrite 1em so unused icons in buttons do not use space */
     }
@@ -855,7 +2465,171 @@ async def application(request):
     .border-c-blue-grey-8 {
       border: 1px solid var(--c-blue-grey-8) !important;
     }
+    .border-c-light-blue-9 {
+      border: 1px solid var(--c-light-blue-9) !important;
+    }
+    .q-dialog .q-field__control {
+      height: 100%;
+      padding: unset;
+    }
+    /* changed coloring */
+    .q-field--dark.changed .q-field__control::before {
+      border-color: #9653f799;
+    }
+    .q-field--dark.changed .q-field__control:hover::before {
+      border-color: #9653f7 !important;
+    }
+  """
+
+class Profiler():
+  """
+  on demand profiling of the server, enabled with -D/--debug or [default]
+  profiling = True
+
+  Usage:
+    GET /debug/profile?seconds=10
+      cProfile of the event loop thread, pstats file (python -m pstats, snakeviz)
+    GET /debug/profile?seconds=10&format=collapsed
+      sampled stacks of all threads, collapsed for flamegraph.pl or speedscope
+    GET /?profile  (any page, e.g. /?tab=media&profile)
+      profiles the page build, the report (functions and time per widget
+      type) is at /debug/profile/page
+  """
+  enabled = False
+  interval = 0.005            # seconds between two stack samples
+  max_seconds = 300
+  running = False             # one cProfile at a time, they can not be nested
+  widget_times = None         # widget type: (count, seconds) while profiling a page build
+  page_report = ''
+
+  @classmethod
+  async def profile(cls, seconds) -> bytes:
+    "cProfile of the event loop thread for seconds, as pstats file"
+    profiler = cProfile.Profile()
+    cls.running = True
+    profiler.enable()
+    try:
+      await asyncio.sleep(seconds)
+    finally:
+      profiler.disable()
+      cls.running = False
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'controldeck.pstats')
+      profiler.dump_stats(path)
+      with open(path, 'rb') as file:
+        return file.read()
+
+  @classmethod
+  def sample(cls, seconds) -> str:
+    "sample the stacks of all other threads for seconds, collapsed stack format"
+    stacks = {}
+    own = threading.get_ident()
+    names = {i.ident: i.name for i in threading.enumerate()}
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+      for ident, frame in sys._current_frames().items():
+        if ident == own:
+          continue
+        stack = []
+        while frame is not None:
+          code = frame.f_code
+          stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+          frame = frame.f_back
+        stack.append(names.get(ident, str(ident)))
+        key = ';'.join(reversed(stack))
+        stacks[key] = stacks.get(key, 0) + 1
+      time.sleep(cls.interval)
+    return ''.join(f"{i} {j}\n" for i, j in sorted(stacks.items()))
+
+  @classmethod
+  async def page(cls, func, request):
+    "build the page with func under cProfile and keep the report"
+    profiler = cProfile.Profile()
+    cls.running = True
+    cls.widget_times = {}
+    t = time.perf_counter()
+    profiler.enable()
+    try:
+      wp = await func(request)
+    finally:
+      profiler.disable()
+      widget_times, cls.widget_times = cls.widget_times, None
+      cls.running = False
+    total = time.perf_counter() - t
+    report = io.StringIO()
+    report.write(f"page build {getattr(request, 'url', '')}: {total:.4f} s\n\n")
+    report.write(f"{'widget type':16} {'count':>6} {'seconds':>10} {'per widget':>12}\n")
+    for wtype, (count, seconds) in sorted(widget_times.items(), key=lambda i: -i[1][1]):
+      report.write(f"{wtype:16} {count:6} {seconds:10.4f} {seconds / count:12.6f}\n")
+    report.write('\n')
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+    cls.page_report = report.getvalue()
+    if DEBUG:
+      print(cls.page_report)
+    return wp
+
+@SetRoute('/debug/profile')
+async def profile_function(request):
+  "profile the server for ?seconds=N (default 10), ?format=pstats (default) or collapsed"
+  if not Profiler.enabled:
+    return Response(status_code=404)
+  try:
+    seconds = min(max(float(request.query_params.get('seconds', 10)), 0.1), Profiler.max_seconds)
+  except ValueError:
+    return PlainTextResponse('seconds must be a number\n', status_code=400)
+  if request.query_params.get('format', 'pstats') == 'collapsed':
+    return PlainTextResponse(await asyncio.to_thread(Profiler.sample, seconds))
+  if Profiler.running:
+    return PlainTextResponse('a profile is already running\n', status_code=409)
+  return Response(
+    await Profiler.profile(seconds), media_type='application/octet-stream',
+    headers={'Content-Disposition': 'attachment; filename="controldeck.pstats"'})
+
+@SetRoute('/debug/profile/page')
+def profile_page_function(request):
+  "report of the last page build profiled with /?profile"
+  if not Profiler.enabled:
+    return Response(status_code=404)
+  return PlainTextResponse(Profiler.page_report or 'no page profiled yet, open a page with ?profile\n')
+
+@SetRoute('/')
+async def application(request):
+  """
+  Components:
+  [QLayout]
+  +-[QHeader]
+    +-[QBar]
+      +-[QBtnToggle] - tabs
+      +-[QSpace]
+      +-[QBtn] - edit
+      +-[ToggleDarkModeBtn]
+      +-[QBtn] - fullscreen
+      +-[QBtn] - reload
+      +-([QBtn]) - close
+  +-[QPageContainer]
+    +-[QPage]
+      +-[QTabPanel]
+      +-[QTabPanel]
+      +-[QTabPanel]
+      +-[QTabPanel]
+      +-...
   """
+  if Profiler.enabled and 'profile' in request.query_params and not Profiler.running:
+    return await Profiler.page(application, request)
+  t = time.perf_counter()
+  wp = QuasarPage(
+    title=APP_NAME,
+    dark=True,
+    classes="blue-grey-10",
+  )
+
+  # can be accessed via msg.page.request
+  wp.request = request
+  tab_choice = request.query_params.get('tab', '[all]')  # if tab is not specified default to [all]
+
+  wp.page_type = 'main'
+  wp.head_html = PAGE_HEAD_HTML
+  wp.css = PAGE_CSS
 
   # quasar version installed v1.9.14
   # v1 bc/ v2 uses vue v3 components but justpy only has vue v2 components
@@ -868,9 +2642,15 @@ async def application(request):
   # wp.body_html = script_html
 
   # scan for widgets to add (adding below) in the config
-  config = config_load()
-  widget_dict = widget_load(config)
-  tab_names = ['[all]'] + list(widget_dict.keys())  # an all tab + all defined tab in the config
+  config, widget_dict = ConfigCache.load()
+  AudioBackend.mode = config.get('default', 'audio-backend', fallback='auto').lower()
+  try:
+    Coalescer.interval = config.getfloat('default', 'slider-interval', fallback=0.0)
+  except ValueError as e:
+    Coalescer.interval = 0.0
+    print(f"Error slider-interval: {e}. fallback to: {Coalescer.interval}")
+  template = PageTemplate.load(widget_dict)
+  tab_names = template.tab_names
 
   layout = QLayout(view="lHh lpr lFf",
                    #container=True,
@@ -896,19 +2676,13 @@ async def application(request):
     #print(msg)
     #print(msg['target'])
     #print(self.value)
-    # tab_panel is defined below
-    if self.value == '[all]':
-      for tab_name in tab_panel.keys():
-        if tab_panel[tab_name].has_class('hidden'):
-          tab_panel[tab_name].remove_class('hidden')
-    else:
-      for tab_name in tab_panel.keys():
-        if not tab_panel[tab_name].has_class('hidden'):
-          tab_panel[tab_name].set_class('hidden')
-      if self.value in tab_panel:
-        tab_panel[self.value].remove_class('hidden')
+    tab_panels_show(msg.page, self.value)
     # change the address field in the browser using pushState (to be able to go 'back') (other would be replaceState)
     await msg.page.run_javascript(f"window.history.pushState('', '', '/?tab={self.value}')")
+    # tabs are built on first show
+    if self.value == '[all]':
+      return await tabs_build_all(msg.page, msg)
+    await tab_build(msg.page, [self.value])
   tab_btns = QBtnToggle(  # 'deep-purple-9'
     toggle_color=COLOR_SELECT, dense=False, flat=False, push=False,
     glossy=False, a=toolbar, input=tab_button_change, value=tab_choice,
@@ -917,28 +2691,7 @@ async def application(request):
   tab_btns.style = 'height:100%;'  # buttons full height
   tab_btns.style += 'width:calc(100vw - 24px - 100.5333px);'  # full width minus padding and 4 btns at the right end
   tab_btns.style += 'overflow-x:auto;'  # scroll content
-  for tab in tab_names:
-    label = tab.capitalize()
-    if tab == '[all]':
-      tab_btns.options.append({
-        'label': '',
-        'value': tab,
-        #'icon': 'fiber_smart_record',
-        #'icon': 'device_hub',
-        'icon': 'brightness_auto',
-        #'icon': 'looks',
-      })
-    elif tab == '':
-      tab_btns.options.append({
-        'label': '',
-        'value': tab,
-        'icon': 'radio_button_unchecked',
-      })
-    else:
-      tab_btns.options.append({
-        'label': label,
-        'value': tab,
-      })
+  tab_btns.options = template.tab_options
 
   QSpace(a=toolbar)
 
@@ -993,7 +2746,7 @@ async def application(request):
   edit_dialog_input = QInput(
     #filled=True,
     type='textarea',
-    style='font-family:monospace,monospace;height:calc(100vh - 64px);',  # 32 bar + 16 padding-top + 16 padding-bottom, two components deeper set height 100% see wp.css below
+    style='font-family:monospace,monospace;height:calc(100vh - 64px);',  # 32 bar + 16 padding-top + 16 padding-bottom, two components deeper set height 100% see PAGE_CSS
     a=edit_dialog_card_section,
     #value='',  # filled by handle toggle_edit_config
     spellcheck=False,
@@ -1016,19 +2769,6 @@ async def application(request):
     # return None to update the widget
   #edit_dialog_input.on('change', edit_dialog_change)  # hits after losing focus
   edit_dialog_input.on('input', edit_dialog_change) # hits during editing
-  wp.css += """
-    .q-dialog .q-field__control {
-      height: 100%;
-      padding: unset;
-    }
-    /* changed coloring */
-    .q-field--dark.changed .q-field__control::before {
-      border-color: #9653f799;
-    }
-    .q-field--dark.changed .q-field__control:hover::before {
-      border-color: #9653f7 !important;
-    }
-  """
   edit_dialog_btn_save.dialog_input = edit_dialog_input
   edit_dialog.dialog_input = edit_dialog_input
   # edit_dialog_editor = QEditor(
@@ -1119,59 +2859,25 @@ async def application(request):
 
   #tab_panels = QTabPanels(v_model='tab', animated=True, a=layout)  # panels not working
   tab_panel = {i:QTabPanel(name=i, classes="q-pa-none", a=page) for i in tab_names}
-  msg = Dict()
-  msg.page = wp
-  await tab_button_change(tab_btns, msg)  # update visibility of tab panels regarding the request
-
-  # add widgets; naming like _div_[tab_name][sec_id]
-  for tab_name in widget_dict:
-    for i in widget_dict[tab_name]:
-      var = "_div_"+tab_name+i     # tab_name: chars or sting-letters, i (sec_id) '' or a string-number
-      for j in widget_dict[tab_name][i]:
-        if var not in vars():
-          vars()[var] = Div(
-            name=var,
-            classes="row q-pa-sm q-gutter-sm",
-            a=tab_panel[tab_name])
-        # TODO: empty using label class, like an alias?
-        if j['widget-class'] == Empty:
-          j['widget-class'](
-            wtype=j['type'],
-            a=eval(var))
-        if j['widget-class'] == Label:
-          j['widget-class'](
-            text=j['text'],
-            wtype=j['type'],
-            a=eval(var))
-        if j['widget-class'] == Button:
-          j['widget-class'](
-            text=j['text'],
-            wtype=j['type'],
-            description=j['description'],
-            description_alt=j['description-alt'],
-            command=j['command'], command_alt=j['command-alt'],
-            command_output=j['command-output'],
-            color_bg=j['color-bg'], color_fg=j['color-fg'],
-            state_pattern=j['state'], state_pattern_alt=j['state-alt'],
-            state_command=j['state-command'],
-            icon=j['icon'], icon_alt=j['icon-alt'],
-            image=j['image'], image_alt=j['image-alt'],
-            a=eval(var))
-        elif j['widget-class'] == Slider:
-          j['widget-class'](
-            name=j['name'], description=j['description'],
-            wtype=j['type'],
-            icon=j['icon'],
-            command=j['command'], state_command=j['state-command'],
-            min=j['min'], max=j['max'], step=j['step'],
-            a=eval(var))
-        elif j['widget-class'] == Volume:
-          j['widget-class'](
-            name=j['name'], description=j['description'],
-            wtype=j['type'],
-            a=eval(var))
-        elif j['widget-class'] == VolumeGroup:
-          j['widget-class'](wtype=j['type'], a=eval(var))
+  # used by page_patch to patch config changes into the page
+  wp.widget_dict = widget_dict
+  wp.tab_btns = tab_btns
+  wp.tab_page = page
+  wp.tab_panel = tab_panel
+  wp.sections = {}      # (tab_name, sec_id): section Div
+  wp.widgets = {}       # config section name: [widget components]
+  wp.built = set()      # tab names with built widgets, see tab_build
+  wp.output_panel = OutputPanel(a=wp)
+  tab_panels_show(wp, tab_choice)  # update visibility of tab panels regarding the request
+
+  # add widgets of the shown tab, the others are built on first show;
+  # [all] starts with the first tab and builds the rest once the page is
+  # connected. naming like _div_[tab_name][sec_id]
+  if tab_choice == '[all]':
+    await tab_build(wp, list(widget_dict)[:1])
+  else:
+    await tab_build(wp, [tab_choice])
+  wp.on('page_ready', page_ready)
 
   # TODO: change reference wp.components to ...
   if not wp.components:
@@ -1204,61 +2910,153 @@ async def application(request):
       self.qnotify.notify = False
     test_btn.on('after', test_btn_after)
 
+  Metrics.page_build.observe(time.perf_counter() - t)
   return wp
 
+@SetRoute('/assets/{name}')
+def assets_function(request):
+  "content hashed images of AssetStore, never change under their name"
+  name = os.path.basename(request.path_params['name'])
+  path = os.path.join(ASSET_DIR, name)
+  if not os.path.isfile(path):
+    return Response(status_code=404)
+  return FileResponse(path, headers={'Cache-Control': 'public, max-age=31536000, immutable'})
+
+@SetRoute('/metrics')
+def metrics_function(request):
+  "metrics in the prometheus text format"
+  return PlainTextResponse(Metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+@SetRoute('/jobs')
+def jobs_function(request):
+  "processes started by buttons and still running, as JSON"
+  return JSONResponse({'jobs': Supervisor.list(), 'stats': Supervisor.stats()})
+
 @SetRoute('/hello')
 def hello_function():
   wp = WebPage()
   wp.add(P(text='Hello there!', classes='text-5xl m-2'))
   return wp
 
-# import asyncio
-# async def clock():
-#   i = 0
-#   while True:
-#     i += 1
-#     print(f"update clock # {i}")
-#     for i,j in Button.instances.items():
-#       if type(j) == Button:
-#         pass
-#         #print(j)
-#         run_task(j.update_state_async())
-#         #await j.update_state()
-#         #j.update_state()
-#     # clock_div.text = time.strftime("%a, %d %b %Y, %H:%M:%S", time.localtime())
-#     run_task(wp.update())
-#     await asyncio.sleep(20)
-
-# async def clock_init():
-#   print("start update clock")
-#   run_task(clock())
-
-def main(args, host, port):
+class Health():
+  """
+  liveness and readiness of the server, served by /healthz
+
+  The server is ready after the warmup: config parsed, page template
+  resolved and the state commands and pulseaudio state fetched once.
+
+  Usage:
+    asyncio.create_task(Health.warmup())
+    Health.status()
+  """
+  start = time.time()
+  ready = False
+
+  @classmethod
+  async def warmup(cls) -> None:
+    try:
+      config, widget_dict = ConfigCache.load()
+      PageTemplate.load(widget_dict)
+      await StateEngine.from_config(config).run(widget_dict)
+    except Exception as e:
+      print(f"warmup failed: {e}")
+    cls.ready = True
+    if DEBUG:
+      print(f"[DEBUG.health] ready after {time.time() - cls.start:.3f} s")
+
+  @classmethod
+  def status(cls) -> dict:
+    return {
+      'status': 'ok' if cls.ready else 'starting',
+      'ready': cls.ready,
+      'uptime': round(time.time() - cls.start, 3),
+      'config_version': ConfigCache.version,
+      'pages': len(main_pages()),
+    }
+
+@SetRoute('/healthz')
+def healthz_function(request):
+  "200 when ready, 503 during the warmup"
+  status = Health.status()
+  return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+async def startup():
+  "background tasks of the server, started with the event loop"
+  Health.start = time.time()
+  config, _ = ConfigCache.load()
+  if config.get('default', 'config-watch', fallback='True').title() == 'True':
+    ConfigWatcher.start()
+  if config.get('default', 'pactl-subscribe', fallback='True').title() == 'True' and shutil.which('pactl'):
+    PulseSubscriber.start()
+  AudioBackend.mode = config.get('default', 'audio-backend', fallback='auto').lower()
+  ShellPool.from_config(config)  # before the warmup runs the state commands
+  if AudioBackend.mode != 'pactl':
+    AudioBackend.connect()
+  Profiler.enabled = DEBUG or config.get('default', 'profiling', fallback='False').title() == 'True'
+  if config.get('default', 'state-poll', fallback='False').title() == 'True':
+    StateScheduler.start(StateEngine.from_config(config).concurrency)
+  asyncio.create_task(Health.warmup())
+
+def uds_bind(path) -> socket.socket:
+  """unix domain socket bound to path, read- and writable only by the user
+  (0600) as it runs commands. a stale socket file of a previous run is
+  replaced, one a running server answers on is not"""
+  if os.path.exists(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+      probe.connect(path)
+      raise OSError(f"socket '{path}' is in use")
+    except (ConnectionRefusedError, FileNotFoundError):
+      os.unlink(path)
+    finally:
+      probe.close()
+  os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+  sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  umask = os.umask(0o177)
+  try:
+    sock.bind(path)
+  finally:
+    os.umask(umask)
+  return sock
+
+def serve(host, port, path, tcp=True) -> None:
+  """run the app on the unix domain socket path and, with tcp, on host:port
+  too. one uvicorn server for both listeners, the app startup runs once"""
+  config = uvicorn.Config(
+    app, host=host, port=int(port), proxy_headers=True,
+    log_level=str(getattr(jpcore.jpconfig, 'UVICORN_LOGGING_LEVEL', 'warning')).lower())
+  sockets = [uds_bind(path)]
+  if tcp:
+    sockets.append(config.bind_socket())
+  if DEBUG:
+    print(f"[DEBUG.serve] socket: {path}, tcp: {f'{host}:{port}' if tcp else None}")
+  try:
+    uvicorn.Server(config).run(sockets=sockets)
+  finally:
+    for sock in sockets:
+      sock.close()
+    try:
+      os.unlink(path)
+    except OSError:
+      pass
+
+def main(args, host, port, path='', tcp=True):
   if not os.path.exists(STATIC_DIR):
     os.makedirs(STATIC_DIR, exist_ok=True)
-  justpy(host=host, port=port, start_server=True)
-  # this process will run as main loop
+  if not path:
+    justpy(host=host, port=port, start_server=True, startup=startup)
+    # this process will run as main loop
+    return
+  # justpy sets up the app and the startup only, serve runs the main loop
+  justpy(host=host, port=port, start_server=False, startup=startup)
+  try:
+    serve(host, port, path, tcp=tcp)
+  except OSError as e:
+    print(f"serve failed: {e}")
 
-def cli():
+def run(args):
+  "start the server with the parsed command line args, see controldeck_core.cli"
   global DEBUG
-  parser = argparse.ArgumentParser(
-    description=__doc__,
-    formatter_class=argparse.RawTextHelpFormatter,  # preserve formatting
-    prefix_chars='-',
-    add_help=False,     # custom help text
-  )
-  parser.add_argument('-c', '--config', nargs='?', type=str, default='',
-                      help="Specify a path to a custom config file (default: ~/.config/controldeck/controldeck.conf)")
-  parser.add_argument('--host', type=str, default='',
-                      help="Specify the host to use (overwrites the value inside the config file, fallbacks to 127.0.0.1)")
-  parser.add_argument('--port', type=str, default='',
-                      help="Specify the port to use (overwrites the value inside the config file, fallbacks to 8000)")
-  parser.add_argument('-v', '--verbose', action="store_true", help="Verbose output")
-  parser.add_argument('-D', '--debug', action='store_true', help=argparse.SUPPRESS)
-  parser.add_argument('-h', '--help', action='store_true',  # action help auto exits
-                      help='Show this help message and exit')
-  args = parser.parse_args()
-
   if args.debug:
     DEBUG = True
     print('[DEBUG] args:', args)
@@ -1272,21 +3070,25 @@ def cli():
     mounts = [{'path': i.path, 'name': i.name, 'directory': i.app.directory} for i in mounts]
     print(f"[DEBUG] app mounts: {mounts}")
 
-  config = config_load(args.config)
+  ConfigCache.conf = args.config
+  config, _ = ConfigCache.load()
   host = args.host if args.host else config.get('default', 'host', fallback='127.0.0.1')
   port = args.port if args.port else config.get('default', 'port', fallback='8000')
 
+  path = config_socket(config, args.socket)
+  tcp = config.get('default', 'socket-only', fallback='False').title() != 'True' or not path
+
   if args.debug:
     print('[DEBUG] host:', host)
     print('[DEBUG] port:', port)
+    print('[DEBUG] socket:', path)
 
-  if args.help:
-    parser.print_help()
-    exit(0)
-
-  main(args, host, port)
+  main(args, host, port, path, tcp)
 
   return 0
 
+def cli():
+  return controldeck_core.cli(run)
+
 if __name__ == '__main__':
   sys.exit(cli())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+ControlDeck core: paths, config and process helpers and the command line
+
+Importable without justpy, controldeck-gui uses it and `controldeck --help`
+is answered before the web stack is loaded, see cli.
+"""
+
+import sys
+import os
+import shlex
+import signal
+import subprocess
+from configparser import ConfigParser
+import argparse
+import threading
+
+APP_NAME = "ControlDeck"
+
+CONFIG_DIR = os.path.join(os.path.expanduser("~"), '.config', APP_NAME.lower())
+CONFIG_FILE_NAME = APP_NAME.lower() + '.conf'
+CONFIG_FILE = os.path.join(CONFIG_DIR, CONFIG_FILE_NAME)
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', APP_NAME.lower())
+STATIC_DIR = os.path.join(CACHE_DIR, 'static')
+ASSET_DIR = os.path.join(CACHE_DIR, 'assets')  # content hashed images, see AssetStore
+
+# output good for short / very fast processes, this will block until done
+# callback good for long processes
+def process(
+    command_line, shell=False, stdout=subprocess.PIPE,
+    stderr=subprocess.STDOUT, output=True, callback=None):
+  try:
+    # with shell=True args can be a string
+    # detached process https://stackoverflow.com/a/65900355/992129 start_new_session
+    # https://docs.python.org/3/library/subprocess.html#popen-constructor
+    # reading the output blocks also the process -> for buttons use output=False
+    # maybe https://stackoverflow.com/questions/375427/a-non-blocking-read-on-a-subprocess-pipe-in-python
+    # print(command_line)
+    if shell:
+      # shell mode for 'easy' program strings with pipes
+      # e.g. DISPLAY=:0 wmctrl -xl | grep emacs.Emacs && DISPLAY=:0 wmctrl -xa emacs.Emacs || DISPLAY=:0 emacs &
+      args = command_line
+    else:
+      args = shlex.split(command_line)
+    # print(args)
+    popen_args = (args, )
+    popen_kwargs = dict(
+      stdout=stdout,
+      stderr=stderr,
+      shell=shell,
+      start_new_session=True,
+    )
+    if callback is not None:
+      def run_in_thread(callback, popen_args, popen_kwargs):
+        proc = subprocess.Popen(*popen_args, **popen_kwargs)
+        proc.wait()
+        callback()
+      thread = threading.Thread(
+        target=run_in_thread,
+        args=(callback, popen_args, popen_kwargs))
+      thread.start()
+    else:
+      # proc = subprocess.Popen(args, stdout=stdout, stderr=stderr, shell=shell, start_new_session=True)
+      proc = subprocess.Popen(*popen_args, **popen_kwargs)
+      if output:
+        res = proc.stdout.read().decode("utf-8").rstrip()
+        proc.kill()  # does not help to unblock
+        proc.wait()  # reap, no zombie
+        # print(res)
+        return res
+      # reap in the background, no zombie
+      threading.Thread(target=proc.wait, daemon=True).start()
+  except Exception as e:
+    print(f"process '{e}' failed!")
+
+def kill_process(proc) -> None:
+  "kill the whole process group, processes are started with start_new_session"
+  try:
+    os.killpg(proc.pid, signal.SIGKILL)
+  except (ProcessLookupError, PermissionError):
+    pass
+
+# asyncio counterpart of process(), does not block the event loop
+# output=True waits for the process and returns its output
+# output=False returns the asyncio process right after the spawn, use
+#   `await proc.wait()` to get notified when it has finished
+async def process_async(
+    command_line, shell=False, stdout=subprocess.PIPE,
+    stderr=subprocess.STDOUT, output=True, timeout=None, stream=False):
+  """run a command, returns its output (None if it failed or timed out) or,
+  for output=False or stream=True, the process. stream=True keeps the
+  stdout pipe for the caller to read, see Button.stream_output"""
+  import asyncio  # not at the top, the core is imported by light clients too
+  try:
+    popen_kwargs = dict(
+      stdout=stdout if output else subprocess.DEVNULL,
+      stderr=stderr if output else subprocess.DEVNULL,
+      start_new_session=True,
+    )
+    if shell:
+      proc = await asyncio.create_subprocess_shell(command_line, **popen_kwargs)
+    else:
+      proc = await asyncio.create_subprocess_exec(*shlex.split(command_line), **popen_kwargs)
+  except Exception as e:
+    print(f"process '{e}' failed!")
+    return None
+  if not output or stream:
+    return proc
+  try:
+    res, _ = await asyncio.wait_for(proc.communicate(), timeout)
+  except asyncio.TimeoutError:
+    print(f"process '{command_line}' timed out after {timeout} s!")
+    kill_process(proc)
+    return None
+  except asyncio.CancelledError:
+    kill_process(proc)
+    raise
+  # state commands might print anything, a decode error must not fail the page
+  return res.decode("utf-8", errors='replace').rstrip() if res is not None else ''
+
+async def command_run(command_line) -> None:
+  "run a shell command and wait until it has finished"
+  proc = await process_async(command_line, shell=True, output=False)
+  if proc is not None:
+    await proc.wait()
+
+def config_path(conf='') -> str:
+  "path of the config file to use"
+  # fist check if file is given
+  if conf:
+    config_file = conf
+  else:
+    # check if config file is located at the script's location
+    config_file = os.path.join(os.path.dirname(os.path.realpath(__file__)), CONFIG_FILE_NAME)  # realpath; resolve symlink
+    if not os.path.exists(config_file):
+      # if not, use the file inside .config
+      os.makedirs(CONFIG_DIR, exist_ok=True)
+      config_file = CONFIG_FILE
+  return os.path.expanduser(config_file)
+
+def config_load(conf=''):
+  config = ConfigParser(strict=False)
+  config_file = config_path(conf)
+  try:
+    config.read(config_file)
+  except Exception as e:
+    print(f"{e}")
+  #print(config.sections())
+  return config
+
+def config_socket(config, socket='') -> str:
+  """path of the unix domain socket of the server, [default] socket or the
+  given one, '~' and environment variables like $XDG_RUNTIME_DIR expanded.
+  '' if the server listens on tcp only"""
+  path = socket if socket else config.get('default', 'socket', fallback='')
+  return os.path.expanduser(os.path.expandvars(path)) if path else ''
+
+def http_connection(host, port, socket_path='', timeout=None):
+  """http.client connection to the server, over its unix domain socket if
+  socket_path is given (see config_socket)
+
+  Usage:
+    conn = http_connection('127.0.0.1', 8000, '/run/user/1000/controldeck.sock', timeout=1)
+    conn.request('GET', '/healthz')
+    conn.getresponse().read()
+  """
+  import http.client  # not at the top, see process_async
+  if not socket_path:
+    host = '127.0.0.1' if host in ('', '0.0.0.0') else host
+    return http.client.HTTPConnection(host, int(port), timeout=timeout)
+  import socket
+  conn = http.client.HTTPConnection('localhost', timeout=timeout)
+  def connect():
+    conn.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    conn.sock.settimeout(timeout)
+    conn.sock.connect(socket_path)
+  conn.connect = connect
+  return conn
+
+def cli_parser():
+  parser = argparse.ArgumentParser(
+    description=__doc__,
+    formatter_class=argparse.RawTextHelpFormatter,  # preserve formatting
+    prefix_chars='-',
+    add_help=False,     # custom help text
+  )
+  parser.add_argument('-c', '--config', nargs='?', type=str, default='',
+                      help="Specify a path to a custom config file (default: ~/.config/controldeck/controldeck.conf)")
+  parser.add_argument('--host', type=str, default='',
+                      help="Specify the host to use (overwrites the value inside the config file, fallbacks to 127.0.0.1)")
+  parser.add_argument('--port', type=str, default='',
+                      help="Specify the port to use (overwrites the value inside the config file, fallbacks to 8000)")
+  parser.add_argument('--socket', type=str, default='',
+                      help="Specify a unix domain socket to listen on too (overwrites the value inside the config file)")
+  parser.add_argument('-v', '--verbose', action="store_true", help="Verbose output")
+  parser.add_argument('-D', '--debug', action='store_true', help=argparse.SUPPRESS)
+  parser.add_argument('-h', '--help', action='store_true',  # action help auto exits
+                      help='Show this help message and exit')
+  return parser
+
+def cli(run=None):
+  """command line of controldeck, justpy is imported only to start the
+  server. run(args) starts it, default controldeck.run"""
+  parser = cli_parser()
+  args = parser.parse_args()
+
+  if args.help:
+    parser.print_help()
+    return 0
+
+  if run is None:
+    from controldeck import run
+  return run(args)
+
+if __name__ == '__main__':
+  sys.exit(cli())
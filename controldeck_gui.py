@@ -3,29 +3,69 @@ import sys
 import os
 import argparse
 from tkinter import Tk, messagebox
+import shutil
+import subprocess
+import http.client
+import json
 import webview
-from controldeck import config_load, process
+from controldeck_core import config_load, config_socket, http_connection, process
 import threading
 import time
 
-def thread_function(name):
-  # print("Thread %s: starting", name)
-  for i in range(10):
-    # print("Thread %s: finishing", name)
-    # p = process("xdotool search --name 'ControlDeck'")
-    # intersection of ControlDeck window name and empty classname
-    p = process("comm -12 <(xdotool search --name 'ControlDeck' | sort) <(xdotool search --classname '^$' | sort)", shell=True)
-    if p:
-      # print(p)
-      # process("xdotool search --name 'ControlDeck' set_window --class 'controldeck'", output=False)
-      # process("xdotool search --name 'ControlDeck' set_window --classname 'controldeck' --class 'ControlDeck' windowunmap windowmap", output=False)  # will find to many wrong ids
-      process(f"xdotool set_window --classname 'controldeck' --class 'ControlDeck' {p} windowunmap {p} windowmap {p}", shell=True, output=False)
-    time.sleep(0.1)
+def window_class_set(pid, title='ControlDeck', attempts=6, delay=0.05) -> bool:
+  """set the class of the window `title` of the process pid to controldeck,
+  for the desktop file (StartupWMClass). One xdotool run per attempt, a
+  window not yet mapped is searched again with exponential backoff
+  (delay, 2*delay, ...). Returns True if the window was found. Independent
+  of pywebview, try it under Xvfb with any X client's pid."""
+  if not os.environ.get('DISPLAY') or not shutil.which('xdotool'):
+    return False
+  for i in range(attempts):
+    # search, set the class and remap in one xdotool process, %@ are all found windows
+    proc = subprocess.run(
+      ['xdotool', 'search', '--all', '--pid', str(pid), '--name', f'^{title}$',
+       'set_window', '--classname', 'controldeck', '--class', 'ControlDeck', '%@',
+       'windowunmap', '%@', 'windowmap', '%@'],
+      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if proc.returncode == 0:
+      return True
+    time.sleep(delay * 2**i)
+  return False
+
+def server_health(host, port, path='', timeout=0.3):
+  """GET /healthz of the server, over its unix domain socket if path is
+  given, returns its status dict (see controldeck Health) or None if it
+  does not answer"""
+  conn = http_connection(host, port, path, timeout=timeout)
+  try:
+    conn.request('GET', '/healthz')
+    return json.loads(conn.getresponse().read())
+  except (OSError, ValueError, http.client.HTTPException):
+    return None
+  finally:
+    conn.close()
+
+def server_wait(host, port, path='', timeout=30.0, delay=0.05):
+  """wait until the server is ready, polling with exponential backoff (at
+  most 1 s between two probes). returns the last status or None"""
+  end = time.monotonic() + timeout
+  while True:
+    status = server_health(host, port, path)
+    if status is not None and status.get('ready'):
+      return status
+    if time.monotonic() >= end:
+      return status
+    time.sleep(min(delay, max(0, end - time.monotonic())))
+    delay = min(delay * 2, 1.0)
 
 def main(args, pid=-1):
   config = config_load(conf=args.config)
   host = config.get('default', 'host', fallback='0.0.0.0')
   port = config.get('default', 'port', fallback='8000')
+  # the window loads the page over tcp, a webview can not use the socket,
+  # the socket is used to detect and wait for the server
+  path = config_socket(config)
+  socket_only = config.get('default', 'socket-only', fallback='False').title() == 'True' and path
   url = f"http://{host}:{port}/?gui&pid={str(pid)}"
   try:
     width = config.getint('gui', 'width', fallback=800)
@@ -73,24 +113,32 @@ def main(args, pid=-1):
     print(f"config file [default]: {config.items('default')}")
     print(f"config file [gui]: {config.items('gui')}")
 
-  #controldeck_process = process("ps --no-headers -C controldeck")
-  controldeck_process = process("ps --no-headers -C controldeck || ps aux | grep -e 'python.*controldeck.py' | grep -v grep", shell=True, output=True)
+  status = server_health(host, port, path)
 
-  if args.start and controldeck_process == "":
+  if args.start and status is None:
     cmd = "controldeck"
-    cmd += " --config={args.config}" if args.config else ""
+    cmd += f" --config={args.config}" if args.config else ""
     print(cmd)
     process(cmd, shell=True, output=False)
+    status = server_wait(host, port, path)
+
+  elif status is not None and not status.get('ready'):
+    status = server_wait(host, port, path)
+
+  message = "controldeck is not running!"
+  if status is not None and socket_only:
+    message = "controldeck listens on its socket only (socket-only = True)!"
+    status = None
 
-  elif controldeck_process == "":
+  if status is None:
     # cli output
-    print("controldeck is not running!")
+    print(message)
 
     # gui output
     # Tkinter must have a root window. If you don't create one, one will be created for you. If you don't want this root window, create it and then hide it:
     root = Tk()
     root.withdraw()
-    messagebox.showinfo("ControlDeck", "controldeck is not running!")
+    messagebox.showinfo("ControlDeck", message)
     # Other option would be to use the root window to display the information (Label, Button)
 
     sys.exit(2)
@@ -124,8 +172,10 @@ def main(args, pid=-1):
     vibrancy=False,
     localization=None,
   )
-  x = threading.Thread(target=thread_function, args=(1,))
-  x.start()
+  # the window is classed once it is shown, it belongs to this process
+  def on_shown():
+    threading.Thread(target=window_class_set, args=(pid,), daemon=True).start()
+  window.events.shown += on_shown
 
   def menu_reload():
     window = webview.active_window()
@@ -0,0 +1,124 @@
+"""
+AudioBackend fallback and retry with a mock backend, PactlBackend against
+the fake pactl of the benchmarks (benchmarks/bin/pactl)
+
+  python -m pytest tests
+"""
+import sys
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.insert(0, ROOT)
+import controldeck
+from controldeck import AudioBackend, PactlBackend
+
+class Recorder():
+  "backend recording its calls, raising error if given"
+  def __init__(self, error=None):
+    self.calls = []
+    self.error = error
+    self.closed = False
+  async def set_volume(self, wtype, name, value, channels=0):
+    self.calls.append(('volume', wtype, name, value))
+    if self.error:
+      raise self.error
+  async def set_mute(self, wtype, name, mute):
+    self.calls.append(('mute', wtype, name, mute))
+    if self.error:
+      raise self.error
+  def close(self):
+    self.closed = True
+
+class AudioBackendTest(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.saved = (AudioBackend.mode, AudioBackend.backend, AudioBackend.fallback,
+                  AudioBackend.last_try, AudioBackend.task)
+    AudioBackend.mode = 'auto'
+    AudioBackend.backend = None
+    AudioBackend.fallback = Recorder()
+    AudioBackend.last_try = -AudioBackend.retry
+    AudioBackend.task = None
+
+  def tearDown(self):
+    (AudioBackend.mode, AudioBackend.backend, AudioBackend.fallback,
+     AudioBackend.last_try, AudioBackend.task) = self.saved
+
+  def test_pactl_mode(self):
+    AudioBackend.backend = Recorder()
+    AudioBackend.mode = 'pactl'
+    self.assertIs(AudioBackend.get(), AudioBackend.fallback)
+
+  async def test_connected(self):
+    backend = AudioBackend.backend = Recorder()
+    await AudioBackend.get().set_volume('sink', 'a', 50, channels=2)
+    await AudioBackend.get().set_mute('source', 'b', True)
+    self.assertEqual(backend.calls, [('volume', 'sink', 'a', 50), ('mute', 'source', 'b', True)])
+    self.assertEqual(AudioBackend.fallback.calls, [])
+
+  async def test_failed_call_falls_back(self):
+    backend = AudioBackend.backend = Recorder(error=OSError('connection lost'))
+    AudioBackend.last_try = time.monotonic()  # no reconnect within the retry interval
+    await AudioBackend.get().set_volume('sink', 'a', 30)
+    self.assertIsNone(AudioBackend.backend)
+    self.assertTrue(backend.closed)
+    self.assertEqual(AudioBackend.fallback.calls, [('volume', 'sink', 'a', 30)])
+    # not connected: pactl until the next connection attempt
+    self.assertIs(AudioBackend.get(), AudioBackend.fallback)
+    self.assertIsNone(AudioBackend.task)
+
+  async def test_retry(self):
+    with mock.patch.object(controldeck, 'PulseBackend', side_effect=OSError('no server')):
+      self.assertIs(AudioBackend.get(), AudioBackend.fallback)
+      first = AudioBackend.task
+      await first
+      self.assertIsNone(AudioBackend.backend)
+      AudioBackend.get()  # within the retry interval, no new attempt
+      self.assertIs(AudioBackend.task, first)
+      AudioBackend.last_try -= AudioBackend.retry
+      AudioBackend.get()
+      self.assertIsNot(AudioBackend.task, first)
+      await AudioBackend.task
+    backend = Recorder()
+    with mock.patch.object(controldeck, 'PulseBackend', return_value=backend):
+      AudioBackend.last_try -= AudioBackend.retry
+      AudioBackend.get()
+      await AudioBackend.task
+    self.assertIs(AudioBackend.backend, backend)
+    self.assertIs(AudioBackend.get(), AudioBackend)
+
+class PactlBackendTest(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.env = mock.patch.dict(os.environ, {
+      'PATH': os.path.join(ROOT, 'benchmarks', 'bin') + os.pathsep + os.environ['PATH'],
+      'CONTROLDECK_FAKE_PACTL': self.directory.name,
+    })
+    self.env.start()
+
+  def tearDown(self):
+    self.env.stop()
+    self.directory.cleanup()
+
+  def calls(self) -> list:
+    with open(os.path.join(self.directory.name, 'calls')) as file:
+      return file.read().splitlines()
+
+  async def test_commands(self):
+    backend = PactlBackend()
+    await backend.set_volume('sink', 'alsa_output.pci', 40)
+    await backend.set_volume('source', 'name with space', 75)
+    await backend.set_mute('sink-input', 12, True)
+    await backend.set_mute('sink', 'alsa_output.pci', False)
+    self.assertEqual(self.calls(), [
+      'set-sink-volume alsa_output.pci 40%',
+      'set-source-volume name with space 75%',
+      'set-sink-input-mute 12 1',
+      'set-sink-mute alsa_output.pci 0',
+    ])
+
+if __name__ == '__main__':
+  unittest.main()
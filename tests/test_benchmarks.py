@@ -0,0 +1,39 @@
+"""
+the benchmarks run with small arguments and print their JSON
+
+  python -m pytest tests
+"""
+import sys
+import os
+import json
+import subprocess
+import unittest
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', 'benchmarks')
+
+def bench(name, *args) -> dict:
+  proc = subprocess.run(
+    [sys.executable, os.path.join(BENCH_DIR, name), *args],
+    capture_output=True, text=True, timeout=300)
+  if proc.returncode != 0:
+    raise AssertionError(proc.stderr)
+  return json.loads(proc.stdout)
+
+class BenchmarkTest(unittest.TestCase):
+  def test_page_build(self):
+    res = bench('page_build.py', '--buttons', '10', '--delay', '0', '--repeat', '1')
+    self.assertEqual([i['buttons'] for i in res['results']], [10])
+
+  def test_update_bytes(self):
+    res = bench('update_bytes.py', '--buttons', '10')
+    row = res['results'][0]
+    self.assertLess(row['component_update_bytes'], row['page_update_bytes'])
+
+  def test_suite(self):
+    res = bench('suite.py', '--sections', '10', '100', '--sinks', '2', '--repeat', '1')
+    fanout = res['results']['state_fanout']
+    # the number of state commands run does not grow with the pages
+    self.assertEqual(len({i['probes'] for i in fanout}), 1)
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,100 @@
+"""
+building the main page '/' from a config
+
+  python -m pytest tests
+"""
+import sys
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+import controldeck
+from controldeck import Button, ConfigCache, StateStore
+
+CONFIG = """
+[default]
+config-watch = False
+pactl-subscribe = False
+
+[a:1.button.on]
+command = true
+state-command = cat {state}
+state-alt = on
+description-alt = ON
+
+[a:1.button.off]
+command = true
+state-command = echo off
+state-alt = on
+
+[a:1.button.plain]
+command = true
+
+[b:1.button.other]
+command = true
+
+[b:2.slider.level]
+command = true {{value}}
+state-command = cat {level}
+"""
+
+class PageTest(unittest.IsolatedAsyncioTestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    state = os.path.join(self.directory.name, 'state')
+    with open(state, 'w') as file:
+      file.write('on')
+    self.level = os.path.join(self.directory.name, 'level')
+    with open(self.level, 'w') as file:
+      file.write('20')
+    self.conf = os.path.join(self.directory.name, 'controldeck.conf')
+    with open(self.conf, 'w') as file:
+      file.write(CONFIG.format(state=state, level=self.level))
+    self.saved = ConfigCache.conf
+    ConfigCache.conf = self.conf
+    StateStore.values, StateStore.times, StateStore.semaphore = {}, {}, None
+
+  def tearDown(self):
+    for wp in controldeck.main_pages():
+      controldeck.WebPage.instances.pop(wp.page_id, None)
+    ConfigCache.conf = self.saved
+    self.directory.cleanup()
+
+  async def test_stateful_buttons(self):
+    wp = await controldeck.application(SimpleNamespace(query_params={}))
+    on = wp.widgets['a:1.button.on'][0]
+    off = wp.widgets['a:1.button.off'][0]
+    plain = wp.widgets['a:1.button.plain'][0]
+    self.assertIsInstance(on, Button)
+    self.assertTrue(on.is_state_alt())
+    self.assertEqual(on.text, 'ON')
+    self.assertIn('state: on', on.tooltip.text)
+    self.assertFalse(off.is_state_alt())
+    self.assertEqual(plain.tooltip.text, 'command: true')
+
+  async def test_tab_change_pushes_visibility(self):
+    wp = await controldeck.application(SimpleNamespace(query_params={}))
+    await controldeck.tab_build(wp, list(wp.widget_dict))
+    change = wp.tab_btns.input  # tab_button_change
+    msg = SimpleNamespace(page=wp)
+    wp.tab_btns.value = 'a'
+    await change(wp.tab_btns, msg)
+    self.assertTrue(wp.tab_panel['b'].has_class('hidden'))
+    # all tabs are built, nothing is pushed by the handler: justpy has to
+    wp.tab_btns.value = '[all]'
+    self.assertIsNone(await change(wp.tab_btns, msg))
+    self.assertFalse(wp.tab_panel['b'].has_class('hidden'))
+
+  async def test_slider_state_pushed(self):
+    wp = await controldeck.application(SimpleNamespace(query_params={'tab': 'b'}))
+    slider = wp.widgets['b:2.slider.level'][0]
+    self.assertEqual(slider.slider.value, 20)
+    with open(self.level, 'w') as file:
+      file.write('70')
+    await StateStore.refresh([f"cat {self.level}"])
+    self.assertEqual(slider.slider.value, 70)
+
+if __name__ == '__main__':
+  unittest.main()
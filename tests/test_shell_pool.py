@@ -0,0 +1,34 @@
+"""
+ShellPool: commands, timeouts and resizing with commands waiting
+
+  python -m pytest tests
+"""
+import sys
+import os
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from controldeck import ShellPool
+
+class ShellPoolTest(unittest.IsolatedAsyncioTestCase):
+  def tearDown(self):
+    ShellPool.configure(0)
+
+  async def test_run(self):
+    ShellPool.configure(1)
+    self.assertEqual(await ShellPool.run("echo out; echo err >&2; exit 3"), ('out\nerr', 3))
+    self.assertEqual(await ShellPool.run("sleep 5", timeout=0.2), (None, None))
+    self.assertEqual(await ShellPool.run("echo after"), ('after', 0))
+
+  async def test_resize_with_waiting_commands(self):
+    for size in (2, 0):
+      ShellPool.configure(1)
+      tasks = [asyncio.create_task(ShellPool.run(f"sleep 0.1; echo {i}")) for i in range(3)]
+      await asyncio.sleep(0.02)  # one running, two waiting
+      ShellPool.configure(size)
+      results = await asyncio.wait_for(asyncio.gather(*tasks), 5)
+      self.assertEqual([i[0] for i in results], ['0', '1', '2'])
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,24 @@
+"""
+Supervisor: command-alt signal names
+
+  python -m pytest tests
+"""
+import sys
+import os
+import signal
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from controldeck import Supervisor
+
+class SignalNumberTest(unittest.TestCase):
+  def test_signal_names(self):
+    self.assertEqual(Supervisor.signal_number('SIGTERM'), signal.SIGTERM)
+    self.assertEqual(Supervisor.signal_number(' SIGINT\n'), signal.SIGINT)
+
+  def test_commands(self):
+    for command in ('stop', 'kill', 'TERM', 'sigterm', 'SIG_DFL', 'SIGNOPE', 'pkill mpv'):
+      self.assertIsNone(Supervisor.signal_number(command), command)
+
+if __name__ == '__main__':
+  unittest.main()